@@ -1,193 +1,331 @@
-import sounddevice as sd
-import numpy as np
+import heapq
 import threading
-import queue
 import time
-from scipy import signal
+from collections import deque
 from utils.logger import logger
 from utils.config_manager import config_manager
-from audio.vad import SileroVAD
-from audio.whisper_local import WhisperLocal
-from audio.whisper_cloud import WhisperCloud
+from utils.startup import startup
+from utils.tracing import tracer
+from audio.transcription_pool import TranscriptionPool
+from audio.engine_registry import EngineManager
+from audio.capture_stream import CaptureStream
+from audio.sources import create_sources
 
 class AudioListener:
-    def __init__(self, on_transcript_callback, on_error_callback=None):
+    """
+    Captures one or more inputs (see audio_streams) and turns their speech
+    into transcripts. Each input is a CaptureStream with its own VAD state
+    and segmentation; all of them share the transcription engine and pool.
+    Transcripts of different streams are handed out in capture order.
+    """
+
+    def __init__(self, on_transcript_callback, on_error_callback=None, on_partial_callback=None,
+                 on_status_callback=None, on_finished_callback=None):
         self.running = False
-        self.on_transcript = on_transcript_callback
+        self.on_transcript = on_transcript_callback # (text, trace_id=None, source="")
         self.on_error = on_error_callback
+        self.on_partial = on_partial_callback # (text, source="")
+        self.on_status = on_status_callback
+        self.on_finished = on_finished_callback # every file source ran out and its transcripts are delivered
         
         self.target_sample_rate = 16000
-        self.device_sample_rate = 16000
         self.block_size = 1024 # Increased block size
-        self.vad = SileroVAD()
+        self.buffer_seconds = 120  # longest segment a stream's ring can hold
+        self.capture_buffer_seconds = 10 # captured audio a stream can fall behind by before dropping
+        self.streams = []
+        # Loaded by preload() in the background (torch import, possible hub fetch)
+        self.vad = None
+        self.stream_vads = [] # one detector per stream index, the first is self.vad
+        self.models_ready = threading.Event()
+        self.preload_thread = None
+        self.preload_lock = threading.Lock()
         
-        # Transcription engines
-        self.whisper_local = None
-        self.whisper_cloud = None
+        # Transcription engine, rebuilt in the background when its settings change
+        self.engines = EngineManager(on_status=on_status_callback, on_swap=self._on_engine_swap)
         
-        self.audio_queue = queue.Queue()
-        self.buffer = []
-        self.vad_buffer = np.array([], dtype=np.float32)
-        self.silence_counter = 0
-        self.speech_active = False
+        # Finished transcripts waiting for the other streams to catch up, by capture time
+        self.ready_transcripts = []
+        self.release_lock = threading.Lock()
+        # Released transcripts not yet handed to on_transcript, and whether a thread is doing so
+        self.outbox = deque()
+        self.emitting = False
+        self.finish_lock = threading.Lock()
+        self.finish_reported = False
         
         # Settings
-        self.silence_threshold = 20  # chunks of silence to trigger end of speech
-        self.min_speech_length = 16000 * 1.0  # Minimum 1 second of speech
+        self.end_of_speech_ms = 672 # silence that ends a segment (21 VAD windows)
+        self.min_speech_ms = 300 # shorter utterances are not transcribed
+        self.preroll_ms = 200 # audio kept before the VAD fires
+        self.trailing_silence_ms = 200 # silence kept after the last speech
+        self.partials_enabled = False
+        self.partial_interval = 0
+        self.partial_window = 0
+        self.max_segment_length = 0
+        self.split_search_length = 0
+        self.energy_gate_enabled = True
+        self.energy_gate_margin = 6.0
         
-        self.processing_thread = None
+        self.transcription_pool = None
 
     def initialize_engines(self):
-        mode = config_manager.get("transcription_mode", "local")
-        if mode == "local":
-            if not self.whisper_local:
-                logger.info("Initializing Local Whisper...")
-                self.whisper_local = WhisperLocal()
-        else:
-            if not self.whisper_cloud:
-                logger.info("Initializing Cloud Whisper...")
-                self.whisper_cloud = WhisperCloud()
+        self.engines.load()
+
+    def _on_engine_swap(self, engine):
+        # Cloud engines keep several requests in flight, one worker each
+        if self.transcription_pool:
+            self.transcription_pool.ensure_workers(getattr(engine, "concurrency", 1))
+            self.transcription_pool.max_batch = self.engines.batch_size()
+
+    def reload_engine(self):
+        """Pick up transcription setting changes; the current engine serves until the new one is ready."""
+        self.engines.reload()
 
     def preload(self):
-        """Preload models in a separate thread"""
-        threading.Thread(target=self.initialize_engines, daemon=True).start()
+        """Load VAD and transcription models in a separate thread (once)"""
+        with self.preload_lock:
+            if self.preload_thread is None:
+                self.preload_thread = threading.Thread(target=self._load_models, daemon=True)
+                self.preload_thread.start()
+
+    def _load_models(self):
+        start = time.monotonic()
+        try:
+            if self.vad is None: # may be preset, e.g. by benchmarks
+                with startup.stage("vad"):
+                    from audio.vad import SileroVAD # Deferred: pulls in torch
+                    self.vad = SileroVAD()
+            with startup.stage("transcription_engine"):
+                self.initialize_engines()
+        except Exception as e:
+            logger.error(f"Model loading failed: {e}")
+            if self.on_error:
+                self.on_error(f"Model loading failed: {e}")
+            return
+        # The VAD is usable either way; a settings change or the next start() retries the engine
+        self.models_ready.set()
+        if self.engines.engine is None:
+            # EngineManager logs the failure and keeps no engine: every segment would come back empty
+            message = (f"No transcription engine could be loaded for transcription_mode "
+                       f"'{config_manager.get('transcription_mode', 'local')}'. See logs/app.log, "
+                       f"or pick another mode in Settings.")
+            logger.error(message)
+            if self.on_error:
+                self.on_error(message)
+            return
+        message = f"Models loaded in {time.monotonic() - start:.1f}s. Ready!"
+        logger.info(message)
+        if self.on_status:
+            self.on_status(message)
 
     def get_devices(self):
         try:
+            import sounddevice as sd
             return sd.query_devices()
         except Exception as e:
             logger.error(f"Error querying devices: {e}")
             return []
 
-    def start(self):
+    def _stream_vad(self, index):
+        """The detector of stream index; streams beyond the first get their own copy."""
+        with self.preload_lock:
+            if not self.stream_vads:
+                self.stream_vads.append(self.vad)
+            while len(self.stream_vads) <= index:
+                self.stream_vads.append(self.vad.fork())
+            return self.stream_vads[index]
+
+    def start(self, source=None):
+        """Start listening on source, or on the inputs configured by audio_streams / audio_source."""
         if self.running:
             return
 
-        self.initialize_engines()
+        # Capture starts right away; the processing loops wait for the models
+        self.preload()
+        if self.models_ready.is_set():
+            self.engines.reload()
+        self.transcription_pool = TranscriptionPool(
+            self._run_transcription,
+            self._deliver_transcript,
+            workers=max(config_manager.get("transcription_workers", 1), self.engines.concurrency()),
+            max_pending=config_manager.get("transcription_queue_size", 4),
+            policy=config_manager.get("transcription_backpressure", "merge"),
+            # Engines that decode several segments in one pass get the backlog in batches
+            batch_fn=self._run_batch,
+            max_batch=self.engines.batch_size(),
+            batch_wait=config_manager.get("transcription_batch_wait_ms", 0) / 1000
+        )
+        self.transcription_pool.start()
+        self.capture_buffer_seconds = config_manager.get("capture_buffer_seconds", 10)
+        self.end_of_speech_ms = config_manager.get("end_of_speech_ms", 672)
+        self.min_speech_ms = config_manager.get("min_speech_ms", 300)
+        self.preroll_ms = config_manager.get("preroll_ms", 200)
+        self.trailing_silence_ms = config_manager.get("trailing_silence_ms", 200)
+        self.partials_enabled = config_manager.get("partial_transcripts", False)
+        self.partial_interval = int(config_manager.get("partial_interval_seconds", 2.0) * self.target_sample_rate)
+        self.partial_window = int(config_manager.get("partial_window_seconds", 10.0) * self.target_sample_rate)
+        # Keep segments inside Whisper's 30s window, cut at the quietest recent point
+        self.max_segment_length = int(config_manager.get("max_segment_seconds", 25.0) * self.target_sample_rate)
+        self.split_search_length = int(config_manager.get("split_search_seconds", 2.0) * self.target_sample_rate)
+        self.energy_gate_enabled = config_manager.get("energy_gate", True)
+        self.energy_gate_margin = config_manager.get("energy_gate_margin_db", 6.0)
+        self.ready_transcripts = []
+        self.outbox = deque()
+        self.emitting = False
+        self.finish_reported = False
+        self.streams = []
         self.running = True
-        self.processing_thread = threading.Thread(target=self._process_audio_loop, daemon=True)
-        self.processing_thread.start()
-        
-        device_index = config_manager.get("audio_device_index")
         
         try:
-            # Query device info to get default sample rate
-            device_info = sd.query_devices(device_index, 'input')
-            self.device_sample_rate = int(device_info['default_samplerate'])
-            logger.info(f"Device {device_index} Native Sample Rate: {self.device_sample_rate}")
-
-            self.stream = sd.InputStream(
-                device=device_index,
-                channels=1,
-                samplerate=self.device_sample_rate,
-                blocksize=self.block_size,
-                callback=self._audio_callback
-            )
-            self.stream.start()
-            logger.info(f"Audio listener started on device {device_index}")
+            inputs = [(source, "")] if source else create_sources(self.block_size)
+            for index, (stream_source, label) in enumerate(inputs):
+                stream = CaptureStream(self, stream_source, label, index)
+                self.streams.append(stream)
+                stream.start()
         except Exception as e:
             logger.error(f"Failed to start audio stream: {e}")
             if self.on_error:
                 self.on_error(str(e))
-            self.running = False
+            self.stop()
 
     def stop(self):
         self.running = False
-        if hasattr(self, 'stream'):
-            try:
-                self.stream.stop()
-                self.stream.close()
-            except:
-                pass
+        for stream in self.streams:
+            stream.stop()
+        # No loop may still feed the pool (or the shared VADs) once it drains or a restart begins
+        for stream in self.streams:
+            if not stream.join():
+                logger.warning(f"Processing loop{f' for {stream.label}' if stream.label else ''} did not stop in time.")
+        if self.transcription_pool:
+            # Segments already queued are still transcribed and delivered
+            self.transcription_pool.stop(drain=True)
+        self._release_transcripts()
         logger.info("Audio listener stopped")
 
-    def _audio_callback(self, indata, frames, time, status):
-        if status:
-            logger.warning(f"Audio status: {status}")
-        if self.running:
-            self.audio_queue.put(indata.copy())
+    def _stream_finished(self, stream):
+        """A stream's input ran out; once all have, wait for their transcripts and report."""
+        with self.finish_lock:
+            if self.finish_reported or not all(s.finished.is_set() for s in self.streams):
+                return
+            self.finish_reported = True
+        self.transcription_pool.wait_idle()
+        self.stop()
+        if self.on_finished:
+            self.on_finished()
 
-    def _process_audio_loop(self):
-        logger.info("Processing loop started")
-        while self.running:
-            try:
-                # Get audio chunk
-                try:
-                    chunk = self.audio_queue.get(timeout=0.5)
-                except queue.Empty:
-                    continue
-
-                # Flatten chunk
-                chunk = chunk.flatten().astype(np.float32)
-
-                # Debug Audio Level
-                rms = np.sqrt(np.mean(chunk**2))
-                if rms > 0.01: # Only log if there's some sound
-                    # logger.debug(f"Audio detected, RMS: {rms:.4f}")
-                    pass
-
-                # Resample if necessary
-                if self.device_sample_rate != self.target_sample_rate:
-                    number_of_samples = int(len(chunk) * self.target_sample_rate / self.device_sample_rate)
-                    chunk = signal.resample(chunk, number_of_samples)
-                
-                # Add to VAD buffer
-                self.vad_buffer = np.concatenate((self.vad_buffer, chunk))
-                
-                # Process in 512-sample chunks (required by Silero)
-                while len(self.vad_buffer) >= 512:
-                    vad_chunk = self.vad_buffer[:512]
-                    self.vad_buffer = self.vad_buffer[512:]
-                    
-                    # VAD Check
-                    is_speech = self.vad.is_speech(vad_chunk, self.target_sample_rate)
-                    
-                    if is_speech:
-                        if not self.speech_active:
-                            logger.info("Speech detected...")
-                        self.speech_active = True
-                        self.silence_counter = 0
-                        self.buffer.append(vad_chunk)
-                    else:
-                        if self.speech_active:
-                            self.silence_counter += 1
-                            self.buffer.append(vad_chunk) # Keep recording silence briefly
-                            
-                            if self.silence_counter > self.silence_threshold:
-                                # End of speech segment
-                                logger.info("End of speech detected.")
-                                self._transcribe_buffer()
-                                self.speech_active = False
-                                self.silence_counter = 0
-                                self.buffer = []
-                        else:
-                            # Just silence, ignore
-                            pass
-                        
-            except Exception as e:
-                logger.error(f"Error in processing loop: {e}")
+    def get_stats(self):
+        """Transcription backlog (queue depth, in-flight jobs, waits), capture losses and energy gate counts."""
+        if not self.transcription_pool:
+            return {}
+        stats = self.transcription_pool.stats()
+        if self.streams:
+            capture = [stream.capture_stats() for stream in self.streams]
+            stats["capture_dropped_frames"] = sum(c["dropped_frames"] for c in capture)
+            stats["capture_overflows"] = sum(c["overflows"] for c in capture)
+            stats["capture_high_water"] = max(c["high_water"] for c in capture)
+        gates = [stream.gate for stream in self.streams if stream.gate]
+        if gates:
+            for key in ("vad_windows", "vad_skipped", "vad_warmup"):
+                stats[key] = sum(gate.stats()[key] for gate in gates)
+        return stats
+
+    def log_stats(self):
+        """Log get_stats() as one line. Returns the stats."""
+        stats = self.get_stats()
+        if not stats:
+            return stats
+        parts = [
+            f"queue {stats['depth']} (peak {stats['max_depth']}), {stats['in_flight']} in flight",
+            f"wait avg {stats['avg_wait']:.2f}s / max {stats['max_wait']:.2f}s",
+            f"{stats['completed']} transcribed, {stats['merged']} merged, {stats['dropped']} dropped",
+        ]
+        if "capture_dropped_frames" in stats:
+            parts.append(f"capture lost {stats['capture_dropped_frames']} frames "
+                         f"({stats['capture_overflows']} overflows), ring peak {stats['capture_high_water']:.0%}")
+        if "vad_windows" in stats:
+            parts.append(f"energy gate skipped {stats['vad_skipped']} of {stats['vad_windows']} VAD windows")
+        logger.info("Pipeline stats: " + "; ".join(parts))
+        return stats
+
+    def _run_transcription(self, full_audio, meta=None):
+        """Runs on a transcription worker thread."""
+        trace_id = meta.get("trace_id") if meta else None
+        tracer.mark(trace_id, "transcribe_start")
+        try:
+            if len(full_audio) == 0:
+                return ""
+            return self.engines.transcribe(full_audio, self.target_sample_rate)
+        finally:
+            tracer.mark(trace_id, "transcribe_end")
+
+    def _run_batch(self, audios, metas):
+        """Runs on a transcription worker thread; returns one text per segment, in order."""
+        trace_ids = [meta.get("trace_id") if meta else None for meta in metas]
+        for trace_id in trace_ids:
+            tracer.mark(trace_id, "transcribe_start")
+        try:
+            texts = [""] * len(audios)
+            # Segments left empty by chunked partials still need their place in the results
+            indices = [i for i, audio in enumerate(audios) if len(audio)]
+            if indices:
+                results = self.engines.transcribe_batch([audios[i] for i in indices], self.target_sample_rate)
+                for i, text in zip(indices, results):
+                    texts[i] = text
+            return texts
+        finally:
+            for trace_id in trace_ids:
+                tracer.mark(trace_id, "transcribe_end")
 
-    def _transcribe_buffer(self):
-        if not self.buffer:
+    def _deliver_transcript(self, text, meta):
+        """Called in submission order once a transcription finishes."""
+        stream = meta["stream"]
+        full_text = stream.deliver(text, meta)
+        if meta["kind"] != "final":
             return
-            
-        full_audio = np.concatenate(self.buffer)
-        
-        if len(full_audio) < self.min_speech_length:
-            logger.info("Audio too short, skipping.")
-            return # Too short
+        if full_text:
+            logger.info(f"Transcript{f' ({stream.label})' if stream.label else ''}: {full_text}")
+        else:
+            tracer.discard(meta["trace_id"])
+        # One hold: between taking the segment off pending and queueing its text, another
+        # thread would see this stream's watermark past it and release later transcripts first
+        with self.release_lock:
+            stream.pop_pending(meta["captured_at"])
+            if full_text:
+                heapq.heappush(self.ready_transcripts,
+                               (meta["captured_at"], id(meta), full_text, meta["trace_id"], stream.label))
+        self._release_transcripts()
 
-        logger.info(f"Transcribing {len(full_audio)/self.target_sample_rate:.2f}s of audio...")
-        
-        mode = config_manager.get("transcription_mode", "local")
-        text = ""
-        
-        if mode == "local" and self.whisper_local:
-            text = self.whisper_local.transcribe(full_audio)
-        elif mode == "cloud" and self.whisper_cloud:
-            text = self.whisper_cloud.transcribe(full_audio, self.target_sample_rate)
-            
-        if text:
-            logger.info(f"Transcript: {text}")
-            if self.on_transcript:
-                self.on_transcript(text)
+    def _release_transcripts(self):
+        """
+        Hand out finished transcripts no other stream can still precede.
+        on_transcript runs outside release_lock, so a slow receiver does not
+        hold up the capture loops and workers; one thread at a time empties
+        the outbox, which keeps the transcripts in order.
+        """
+        with self.release_lock:
+            while self.ready_transcripts:
+                watermark = min((s.watermark() for s in self.streams), default=float("inf"))
+                if self.ready_transcripts[0][0] > watermark:
+                    break
+                _, _, text, trace_id, label = heapq.heappop(self.ready_transcripts)
+                self.outbox.append((text, trace_id, label))
+            if self.emitting:
+                return # the thread emitting now picks these up too
+            self.emitting = True
+        while True:
+            with self.release_lock:
+                if not self.outbox:
+                    self.emitting = False
+                    return
+                text, trace_id, label = self.outbox.popleft()
+            if not self.on_transcript:
+                tracer.discard(trace_id)
+                continue
+            try:
+                # The receiver marks the callback and render stages and finishes the trace
+                self.on_transcript(text, trace_id=trace_id, source=label)
+            except Exception as e:
+                logger.error(f"Transcript callback failed: {e}")
+
+    def _emit_partial(self, stream, text):
+        if self.on_partial:
+            self.on_partial(text, source=stream.label)
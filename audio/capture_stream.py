@@ -0,0 +1,347 @@
+import numpy as np
+import threading
+import time
+from collections import deque
+from utils.logger import logger
+from utils.tracing import tracer
+from audio.resampler import StreamingResampler
+from audio.ring_buffer import AudioRingBuffer, CaptureRing
+from audio.segmentation import find_quiet_split, Segmenter
+from audio.energy_gate import EnergyGate
+
+
+class CaptureStream:
+    """
+    One input captured by AudioListener: its source, resampler, ring buffer,
+    VAD state and segmentation, processed on its own thread.
+
+    Finished segments go to the listener's shared transcription pool with
+    this stream in their meta, so several streams share one engine and one
+    set of workers.
+    """
+
+    def __init__(self, listener, source, label="", index=0):
+        self.listener = listener
+        self.source = source
+        self.label = label
+        self.index = index
+        self.target_sample_rate = listener.target_sample_rate
+        self.vad = None # assigned once the models are loaded
+        # Skips Silero on windows at the noise floor (silence on a loopback cable)
+        self.gate = EnergyGate(listener.energy_gate_margin) if listener.energy_gate_enabled else None
+        self.resampler = None
+        # Written in place by the source callback, read in bulk by the processing loop
+        self.capture = CaptureRing(source.sample_rate * listener.capture_buffer_seconds)
+        self.max_read = source.sample_rate # at most a second of audio per pass
+        self.source_done = False
+        self.reported_losses = (0, 0) # (dropped frames, input overflows) already logged
+        self.thread = None
+
+        self.vad_window = 512  # samples per Silero window at 16kHz
+        # One ring serves both VAD framing (vad_pos) and the active utterance (segmenter.start)
+        self.ring = AudioRingBuffer(self.target_sample_rate * listener.buffer_seconds)
+        self.vad_pos = 0
+        self.segmenter = Segmenter(self.target_sample_rate, self.vad_window, listener.end_of_speech_ms,
+                                   listener.min_speech_ms, listener.preroll_ms, listener.trailing_silence_ms)
+
+        # Partial transcripts: audio before committed_pos is already queued as
+        # fixed chunks of the active segment, only the tail is re-decoded
+        self.committed_pos = 0
+        self.last_partial_pos = 0
+        self.segment_texts = [] # delivered chunk texts of the active segment
+        self.trace_id = None # latency trace of the active segment
+
+        # Capture clock shared by all streams, used to interleave their transcripts
+        self.start_time = None # time.monotonic() of the first captured sample
+        self.pending = deque() # capture times of final segments queued but not yet delivered
+        self.processed_pos = 0 # vad_pos after the last fully processed block
+        # Set by stop() or at the end of the input; this stream's loop exits on it,
+        # so a listener restarted meanwhile cannot keep an old loop running
+        self.finished = threading.Event()
+
+    def start(self):
+        self.resampler = StreamingResampler(self.source.sample_rate, self.target_sample_rate)
+        self.thread = threading.Thread(target=self._process_audio_loop, name=f"capture-{self.index}", daemon=True)
+        self.thread.start()
+        self.source.start(self._audio_callback, self._source_finished)
+
+    def stop(self):
+        self.finished.set()
+        self.source.stop()
+
+    def join(self, timeout=2.0):
+        """Wait for the processing loop to exit after stop(). Returns False if it is still running."""
+        if self.thread is None or self.thread is threading.current_thread():
+            return True
+        self.thread.join(timeout)
+        return not self.thread.is_alive()
+
+    def capture_time(self, pos):
+        """time.monotonic() at which the 16kHz sample at pos was captured."""
+        return (self.start_time or 0.0) + pos / self.target_sample_rate
+
+    def watermark(self, stall_grace=1.0):
+        """
+        No transcript from this stream still to come ends before this capture time.
+        Called with the listener's release_lock held, which also guards pending.
+        """
+        if self.pending:
+            return self.pending[0]
+        if self.finished.is_set():
+            return float("inf")
+        bound = self.processed_pos
+        if self.segmenter.active:
+            # A split may cut the active segment up to split_search_length back,
+            # and its end trims the trailing silence back to the last speech
+            bound = min(bound - self.listener.split_search_length, self.segmenter.last_speech_end)
+            bound = max(self.committed_pos, bound)
+        # A stream whose device stopped delivering must not hold the others back forever
+        return max(self.capture_time(bound), time.monotonic() - stall_grace)
+
+    def _audio_callback(self, block):
+        # Source thread: no allocation and no locks, just a copy into the capture ring
+        if self.start_time is None:
+            self.start_time = time.monotonic() - len(block) / self.source.sample_rate
+        if self.finished.is_set():
+            return True
+        return self.capture.write(block)
+
+    def _source_finished(self):
+        # Every block the source delivered is in the capture ring by now
+        self.source_done = True
+
+    def capture_stats(self):
+        return {
+            "dropped_frames": getattr(self.source, "dropped_frames", 0),
+            "overflows": getattr(self.source, "overflows", 0),
+            "high_water": self.capture.high_water / self.capture.capacity,
+        }
+
+    def _report_losses(self):
+        stats = self.capture_stats()
+        losses = (stats["dropped_frames"], stats["overflows"])
+        if losses != self.reported_losses:
+            dropped = losses[0] - self.reported_losses[0]
+            overflows = losses[1] - self.reported_losses[1]
+            logger.warning(f"Audio lost{f' on {self.label}' if self.label else ''}: "
+                           f"{dropped} frames dropped (capture ring full), {overflows} input overflows")
+            self.reported_losses = losses
+
+    def _finish_source(self):
+        """The input ran out: close the open segment."""
+        if self.segmenter.active:
+            logger.info("End of input, transcribing the open segment.")
+            tracer.mark(self.trace_id, "speech_end")
+            self._transcribe_buffer(end=self.segmenter.end_pos(self.vad_pos))
+            self.segmenter.active = False
+        self.finished.set()
+        self.listener._stream_finished(self)
+
+    def _process_audio_loop(self):
+        logger.info(f"Processing loop started{f' for {self.label}' if self.label else ''}")
+        listener = self.listener
+        # Blocks collect in the capture ring meanwhile and are processed once the models are loaded
+        while not self.finished.is_set() and not listener.models_ready.wait(0.5):
+            pass
+        if not self.finished.is_set():
+            self.vad = listener._stream_vad(self.index)
+            # Same input, same VAD decisions: no state carried over from a previous run
+            self.vad.reset_states()
+        while not self.finished.is_set():
+            try:
+                # Everything captured since the last pass, read once the source is known to be done
+                source_done = self.source_done
+                block = self.capture.peek(self.max_read)
+                self._report_losses()
+                if not len(block):
+                    if source_done:
+                        self._finish_source()
+                        break
+                    listener._release_transcripts()
+                    time.sleep(0.01)
+                    continue
+
+                segmenter = self.segmenter
+                try:
+                    # Resample if necessary (stateful, so block edges stay continuous)
+                    chunk = block
+                    if self.resampler and not self.resampler.passthrough:
+                        chunk = self.resampler.process(block)
+
+                    # A segment must never outgrow the ring, flush it early if it would
+                    if segmenter.active and self.ring.write_pos + len(chunk) - segmenter.start > self.ring.capacity:
+                        logger.warning("Segment filled the audio buffer, transcribing early.")
+                        tracer.mark(self.trace_id, "speech_end")
+                        self._transcribe_buffer()
+                        segmenter.restart(self.vad_pos)
+                        self.committed_pos = self.vad_pos
+                        self.trace_id = tracer.begin("segment", "speech_start")
+
+                    self.ring.write(chunk)
+                finally:
+                    # The view is done with once its samples are in the segment ring
+                    self.capture.consume(len(block))
+
+                # Score every complete 512-sample window (required by Silero) in one call
+                window_count = (self.ring.write_pos - self.vad_pos) // self.vad_window
+                if window_count == 0:
+                    continue
+                windows = self.ring.view(self.vad_pos, self.vad_pos + window_count * self.vad_window)
+                speech_probs = self._score_windows(windows.reshape(window_count, self.vad_window))
+
+                for prob in speech_probs:
+                    window_start = self.vad_pos
+                    self.vad_pos += self.vad_window
+                    event = segmenter.update(window_start, prob > self.vad.threshold)
+
+                    if event == "start":
+                        logger.info("Speech detected...")
+                        self.trace_id = tracer.begin("segment", "speech_start")
+                        # The segment starts before this window by the pre-roll
+                        self.committed_pos = segmenter.start
+                        self.last_partial_pos = segmenter.start
+                    elif event == "end":
+                        logger.info("End of speech detected.")
+                        tracer.mark(self.trace_id, "speech_end")
+                        self._transcribe_buffer(end=segmenter.end_pos(self.vad_pos))
+
+                    if segmenter.active and self.vad_pos - segmenter.start >= listener.max_segment_length:
+                        self._split_segment()
+
+                    if (segmenter.active and listener.partials_enabled
+                            and self.vad_pos - self.last_partial_pos >= listener.partial_interval):
+                        self._queue_partial()
+
+                self.processed_pos = self.vad_pos
+                # Other streams' transcripts may have been waiting for this one to catch up
+                listener._release_transcripts()
+
+            except Exception as e:
+                logger.error(f"Error in processing loop: {e}")
+
+    def _score_windows(self, windows):
+        """Speech probability per window; windows the energy gate skips score 0."""
+        if self.gate is None:
+            return self.vad.speech_probs(windows, self.target_sample_rate)
+        levels = self.gate.levels_db(windows)
+        # Inside a segment every window is scored, the end of speech must not be guessed
+        mask, lead = self.gate.select(levels, force=self.segmenter.active)
+        lead_start = self.vad_pos - lead * self.vad_window
+        if lead and lead_start >= self.ring.oldest_pos:
+            self.vad.speech_probs(self.ring.view(lead_start, self.vad_pos).reshape(lead, self.vad_window),
+                                  self.target_sample_rate)
+        if mask.all():
+            probs = self.vad.speech_probs(windows, self.target_sample_rate)
+        else:
+            probs = np.zeros(len(windows), dtype=np.float32)
+            # The runs the gate let through are scored in order. Once one holds speech
+            # a segment may have started, and the rest of the batch is scored as inside one
+            edges = np.flatnonzero(np.diff(np.concatenate(([0], mask.view(np.int8), [0]))))
+            for start, end in zip(edges[::2], edges[1::2]):
+                probs[start:end] = self.vad.speech_probs(windows[start:end], self.target_sample_rate)
+                if end < len(windows) and (probs[start:end] > self.vad.threshold).any():
+                    self.gate.open_from(mask, end)
+                    probs[end:] = self.vad.speech_probs(windows[end:], self.target_sample_rate)
+                    break
+        self.gate.update_floor(levels, probs > self.vad.threshold)
+        return probs
+
+    def _quiet_point(self, start, end):
+        """Absolute position of the quietest point within the last split_search_length samples of [start, end)."""
+        search_start = max(start, end - self.listener.split_search_length)
+        return search_start + find_quiet_split(self.ring.view(search_start, end))
+
+    def _split_segment(self):
+        """Send a segment that hit max_segment_length now, carrying the audio after the cut over."""
+        cut = self._quiet_point(self.committed_pos, self.vad_pos)
+        logger.info(f"Segment reached {self.listener.max_segment_length/self.target_sample_rate:.0f}s, "
+                    f"splitting {(self.vad_pos - cut)/self.target_sample_rate:.2f}s before the end.")
+        tracer.mark(self.trace_id, "speech_end")
+        self._transcribe_buffer(end=cut)
+        # The remainder is traced as a segment of its own
+        self.trace_id = tracer.begin("segment", "speech_start")
+        # A remainder with too little speech after the cut is dropped like any short segment
+        self.segmenter.restart(cut)
+        self.committed_pos = cut
+        self.last_partial_pos = cut
+
+    def _transcribe_buffer(self, end=None):
+        """Queue the rest of the active segment, up to end, as its final piece."""
+        # Chunks already committed are never taken back by trimming
+        end = self.vad_pos if end is None else max(end, self.committed_pos)
+        segment_length = end - self.segmenter.start
+        trace_id, self.trace_id = self.trace_id, None
+        if not self.segmenter.long_enough():
+            if self.committed_pos == self.segmenter.start:
+                logger.info("Audio too short, skipping.")
+                tracer.discard(trace_id)
+                return # Too short
+            # Chunks of this segment are already queued: only the tail is left out, the
+            # final job still runs so their text is emitted
+            end = self.committed_pos
+            segment_length = end - self.segmenter.start
+
+        logger.info(f"Queueing {segment_length/self.target_sample_rate:.2f}s of audio for transcription...")
+        # May be empty when the whole segment was already committed in chunks;
+        # the job still runs so the segment's final text is emitted in order
+        tail = self.ring.copy(self.committed_pos, end)
+        tracer.annotate(trace_id, audio_s=round(segment_length / self.target_sample_rate, 2))
+        if self.label:
+            tracer.annotate(trace_id, source=self.label)
+        captured_at = self.capture_time(end)
+        with self.listener.release_lock:
+            self.pending.append(captured_at)
+        self.listener.transcription_pool.submit(
+            tail, {"kind": "final", "trace_id": trace_id, "stream": self, "captured_at": captured_at},
+            group=self.index)
+
+    def _queue_partial(self):
+        """
+        Re-decode the growing tail of the active segment for provisional text.
+        Once the tail reaches partial_window it is committed as a fixed chunk,
+        so each decode stays bounded however long the speaker goes on.
+        """
+        pool = self.listener.transcription_pool
+        self.last_partial_pos = self.vad_pos
+        if self.vad_pos - self.committed_pos >= self.listener.partial_window:
+            # Commit at a quiet point so the next chunk doesn't start mid-word
+            cut = self._quiet_point(self.committed_pos, self.vad_pos)
+            pool.submit(self.ring.copy(self.committed_pos, cut), {"kind": "chunk", "stream": self}, group=self.index)
+            self.committed_pos = cut
+        elif pool.idle():
+            # Previews are only worth running when they don't delay real work
+            tail = self.ring.copy(self.committed_pos, self.vad_pos)
+            pool.submit(tail, {"kind": "preview", "stream": self}, preview=True, group=self.index)
+
+    def deliver(self, text, meta):
+        """
+        Called in segment order once a transcription of this stream finishes.
+        Returns the full text of a finished segment, or None.
+        """
+        kind = meta["kind"]
+        if kind == "preview":
+            if text:
+                self.listener._emit_partial(self, " ".join(self.segment_texts + [text]))
+            return None
+
+        if text:
+            self.segment_texts.append(text)
+        if kind == "chunk":
+            if self.segment_texts:
+                self.listener._emit_partial(self, " ".join(self.segment_texts))
+            return None
+
+        # The listener takes this final off pending (see pop_pending) in the same
+        # release_lock hold that queues its text, so the watermark never skips it
+        full_text = " ".join(self.segment_texts)
+        self.segment_texts = []
+        return full_text
+
+    def pop_pending(self, captured_at):
+        """
+        Drop the finals up to captured_at from pending; finals merged into this
+        job under backpressure are never delivered themselves.
+        Called with the listener's release_lock held.
+        """
+        while self.pending and self.pending[0] <= captured_at:
+            self.pending.popleft()
@@ -0,0 +1,100 @@
+import numpy as np
+
+
+class EnergyGate:
+    """
+    Adaptive noise-floor gate in front of the neural VAD.
+
+    Windows whose level stays within margin_db of the tracked noise floor
+    skip Silero and count as silence. The gate opens for any louder window,
+    stays open for `hangover` windows after the last one, and the caller
+    forces it open while a segment is active (or, with open_from(), from
+    the point a segment starts mid-batch). On opening, the `preroll`
+    skipped windows before the onset are scored too, so Silero's recurrent
+    state has context when speech starts.
+
+    The floor falls quickly to quieter input and rises slowly, and only
+    follows windows Silero did not call speech.
+    """
+
+    def __init__(self, margin_db=6.0, hangover=8, preroll=2, rise_rate=0.002, fall_rate=0.2):
+        self.margin_db = margin_db
+        self.hangover = hangover
+        self.preroll = preroll
+        self.rise_rate = rise_rate
+        self.fall_rate = fall_rate
+        self.reset()
+
+    def reset(self):
+        self.floor_db = None
+        self.hold = 0 # windows the gate stays open for
+        self.closed_run = 0 # consecutive skipped windows up to now
+        # Counters exposed through stats()
+        self.windows = 0
+        self.skipped = 0
+        self.warmup = 0
+
+    @staticmethod
+    def levels_db(windows):
+        # -100 dBFS stands in for digital silence
+        return 10 * np.log10(np.mean(np.square(windows, dtype=np.float32), axis=1) + 1e-10)
+
+    def select(self, levels, force=False):
+        """
+        Decide which windows need the neural VAD.
+        Returns (mask, lead): mask marks the windows to score, lead is how many
+        windows just before this batch should be scored first to warm up the VAD.
+        """
+        n = len(levels)
+        mask = np.zeros(n, dtype=bool)
+        lead = 0
+        if self.floor_db is None and n:
+            self.floor_db = float(levels[0])
+        for i in range(n):
+            if force or levels[i] > self.floor_db + self.margin_db:
+                self.hold = self.hangover + 1
+            if self.hold:
+                self.hold -= 1
+                mask[i] = True
+                if self.closed_run:
+                    # Gate opening: give the VAD the quiet lead-in it skipped
+                    k = min(self.preroll, self.closed_run)
+                    mask[max(0, i - k):i] = True
+                    lead = max(lead, k - i)
+                self.closed_run = 0
+            else:
+                self.closed_run += 1
+
+        self.windows += n
+        self.skipped += n - int(mask.sum())
+        self.warmup += lead
+        return mask, lead
+
+    def open_from(self, mask, index):
+        """
+        Score every window of the batch from index on after all, as if the
+        caller had forced the gate there: a segment started mid-batch.
+        Updates mask in place and returns how many windows it added.
+        """
+        added = int(np.count_nonzero(~mask[index:]))
+        mask[index:] = True
+        self.skipped -= added
+        self.hold = self.hangover # forced on the batch's last window
+        self.closed_run = 0
+        return added
+
+    def update_floor(self, levels, speech):
+        """Track the noise floor on windows that were not speech."""
+        for level, is_speech in zip(levels, speech):
+            if is_speech:
+                continue
+            rate = self.fall_rate if level < self.floor_db else self.rise_rate
+            self.floor_db += rate * (level - self.floor_db)
+
+    def stats(self):
+        return {
+            "vad_windows": self.windows,
+            "vad_skipped": self.skipped,
+            "vad_warmup": self.warmup,
+            "noise_floor_db": self.floor_db,
+        }
@@ -0,0 +1,213 @@
+import gc
+import sys
+import threading
+import time
+from utils.logger import logger
+from utils.config_manager import config_manager
+
+
+class EngineSpec:
+    def __init__(self, mode, label, factory, config_keys):
+        self.mode = mode
+        self.label = label
+        self.factory = factory
+        self.config_keys = config_keys
+
+    def settings_key(self):
+        """Current values of the settings this engine is built from."""
+        return (self.mode,) + tuple(config_manager.get(k) for k in self.config_keys)
+
+
+ENGINE_REGISTRY = {}
+
+
+def register_engine(mode, label, factory, config_keys=()):
+    """
+    Make a transcription engine selectable as transcription_mode = mode.
+    factory() builds the engine; changing any of config_keys rebuilds it.
+    Engines provide transcribe(audio_data, sample_rate) and optionally close()
+    and transcribe_batch(audios, sample_rate), which returns one text per audio
+    in order.
+    """
+    ENGINE_REGISTRY[mode] = EngineSpec(mode, label, factory, tuple(config_keys))
+
+
+# Engine modules are imported by their factory so only the selected one is loaded
+
+def _build_local():
+    from audio.whisper_local import WhisperLocal
+    return WhisperLocal()
+
+
+def _build_faster():
+    from audio.whisper_faster import WhisperFaster
+    return WhisperFaster()
+
+
+def _build_cloud():
+    from audio.whisper_cloud import WhisperCloud
+    return WhisperCloud()
+
+
+register_engine("local", "Local Whisper", _build_local, ["whisper_model_size"])
+register_engine("faster", "faster-whisper", _build_faster,
+                ["whisper_model_size", "faster_whisper_compute_type", "faster_whisper_threads"])
+# Key and base URL changes need no rebuild, the shared client (utils/openai_client.py) follows them
+register_engine("cloud", "Cloud Whisper", _build_cloud,
+                ["cloud_audio_format", "cloud_max_in_flight", "cloud_request_timeout", "cloud_max_retries"])
+
+
+class EngineManager:
+    """
+    Owns the active transcription engine.
+
+    When the relevant settings change, the replacement is built on a
+    background thread while the current engine keeps transcribing. The swap
+    is a single reference change, so a segment is always transcribed by
+    one engine from start to end; the old engine is closed once its last
+    in-flight segment finishes.
+    """
+
+    def __init__(self, on_status=None, on_swap=None):
+        self.on_status = on_status
+        self.on_swap = on_swap
+        self.engine = None
+        self.key = None
+        self.loading_key = None
+        self._lock = threading.Condition()
+        self._in_use = {} # id(engine) -> segments currently being transcribed
+
+    def _spec(self):
+        mode = config_manager.get("transcription_mode", "local")
+        spec = ENGINE_REGISTRY.get(mode)
+        if spec is None:
+            logger.error(f"Unknown transcription_mode '{mode}', using local.")
+            spec = ENGINE_REGISTRY["local"]
+        return spec
+
+    def _status(self, message):
+        logger.info(message)
+        if self.on_status:
+            self.on_status(message)
+
+    def load(self):
+        """Build the configured engine on the calling thread if it isn't loaded yet."""
+        spec = self._spec()
+        key = spec.settings_key()
+        with self._lock:
+            # Another thread is already building it: wait for that instead
+            while key == self.loading_key:
+                self._lock.wait()
+            if key == self.key:
+                return
+            self.loading_key = key
+        self._build(spec, key)
+
+    def reload(self):
+        """Rebuild in the background if the engine settings changed since the last load."""
+        spec = self._spec()
+        key = spec.settings_key()
+        with self._lock:
+            if key in (self.key, self.loading_key):
+                return
+            self.loading_key = key
+        threading.Thread(target=self._build, args=(spec, key), daemon=True).start()
+
+    def _build(self, spec, key):
+        self._status(f"Loading {spec.label}...")
+        done = threading.Event()
+        start = time.monotonic()
+
+        def report_progress():
+            while not done.wait(10):
+                self._status(f"Still loading {spec.label} ({time.monotonic() - start:.0f}s)...")
+
+        threading.Thread(target=report_progress, daemon=True).start()
+        try:
+            engine = spec.factory()
+            # Engines log and keep model = None when loading fails
+            if getattr(engine, "model", True) is None:
+                engine = None
+        except Exception as e:
+            engine = None
+            logger.error(f"Failed to build {spec.label}: {e}")
+        finally:
+            done.set()
+        elapsed = time.monotonic() - start
+
+        retired = None
+        with self._lock:
+            superseded = self.loading_key != key
+            if superseded:
+                retired = engine
+            else:
+                self.loading_key = None
+                if engine is not None:
+                    retired, self.engine, self.key = self.engine, engine, key
+            self._lock.notify_all()
+
+        if superseded:
+            logger.info(f"{spec.label} load was superseded by newer settings, discarding it.")
+        elif engine is None:
+            self._status(f"{spec.label} failed to load, keeping the previous engine.")
+        else:
+            self._status(f"{spec.label} ready (loaded in {elapsed:.1f}s).")
+            if self.on_swap:
+                self.on_swap(engine)
+        if retired is not None:
+            # Passed in a list so the thread's args don't keep the engine alive
+            threading.Thread(target=self._retire, args=([retired],), daemon=True).start()
+
+    def _retire(self, holder):
+        # Wait for segments still running on the old engine, then free it
+        engine = holder.pop()
+        with self._lock:
+            while self._in_use.get(id(engine)):
+                self._lock.wait()
+        close = getattr(engine, "close", None)
+        if close:
+            try:
+                close()
+            except Exception as e:
+                logger.error(f"Error closing transcription engine: {e}")
+        del engine
+        gc.collect()
+        torch = sys.modules.get("torch")
+        if torch is not None and torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+    def concurrency(self):
+        """How many segments the active engine can usefully transcribe at once."""
+        return getattr(self.engine, "concurrency", 1)
+
+    def batch_size(self):
+        """How many queued segments to hand the active engine at once."""
+        if not hasattr(self.engine, "transcribe_batch"):
+            return 1
+        return max(1, int(config_manager.get("transcription_batch_size", 4)))
+
+    def transcribe(self, audio_data, sample_rate=16000):
+        return self._run(lambda engine: engine.transcribe(audio_data, sample_rate), "")
+
+    def transcribe_batch(self, audios, sample_rate=16000):
+        def run(engine):
+            if hasattr(engine, "transcribe_batch"):
+                return engine.transcribe_batch(audios, sample_rate)
+            # Swapped to an engine without batching since the batch was formed
+            return [engine.transcribe(audio, sample_rate) for audio in audios]
+        return self._run(run, [""] * len(audios))
+
+    def _run(self, call, empty):
+        with self._lock:
+            engine = self.engine
+            if engine is None:
+                return empty
+            self._in_use[id(engine)] = self._in_use.get(id(engine), 0) + 1
+        try:
+            return call(engine)
+        finally:
+            with self._lock:
+                self._in_use[id(engine)] -= 1
+                if not self._in_use[id(engine)]:
+                    del self._in_use[id(engine)]
+                    self._lock.notify_all()
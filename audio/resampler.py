@@ -0,0 +1,104 @@
+from math import gcd
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+
+
+class StreamingResampler:
+    """
+    Rational-ratio polyphase resampler that keeps its filter state across blocks.
+
+    Blocks of any length can be pushed in; each call returns the output samples
+    owed for the input seen so far (in whole filter periods of `down` input
+    samples), so block boundaries leave no artifacts and the total output
+    length tracks input_length * ratio.
+    """
+
+    def __init__(self, input_rate, output_rate, half_length=10, beta=5.0):
+        self.input_rate = int(input_rate)
+        self.output_rate = int(output_rate)
+        g = gcd(self.input_rate, self.output_rate)
+        self.up = self.output_rate // g
+        self.down = self.input_rate // g
+        if self.up == self.down:
+            return
+
+        from scipy import signal # Deferred: only needed for non-16kHz devices
+
+        # Same anti-aliasing design as scipy.signal.resample_poly
+        max_rate = max(self.up, self.down)
+        num_taps = 2 * half_length * max_rate + 1
+        taps = signal.firwin(num_taps, 1.0 / max_rate, window=('kaiser', beta))
+        taps *= self.up
+        self.taps = taps # the full filter, e.g. for an offline reference with signal.upfirdn
+
+        # Split into one sub-filter per phase: bank[p, j] = taps[p + j * up].
+        # Rows are reversed so they line up with forward-ordered input windows.
+        self.taps_per_phase = -(-num_taps // self.up)
+        padded = np.zeros(self.taps_per_phase * self.up)
+        padded[:num_taps] = taps
+        bank = padded.reshape(self.taps_per_phase, self.up).T
+        bank = bank[:, ::-1]
+
+        # Outputs repeat their phase pattern every `up` outputs (`down` inputs).
+        # Precompute one period: the input offset and sub-filter for each slot,
+        # spread into a matrix over the inputs the period reads, so a block of
+        # whole periods is one strided view times one matrix (no gather).
+        slots = np.arange(self.up) * self.down
+        self.period_offsets = slots // self.up
+        self.period_bank = np.ascontiguousarray(bank[slots % self.up], dtype=np.float32)
+        self.period_span = int(self.period_offsets[-1]) + self.taps_per_phase
+        matrix = np.zeros((self.period_span, self.up), dtype=np.float32)
+        for slot, offset in enumerate(self.period_offsets):
+            matrix[offset:offset + self.taps_per_phase, slot] = self.period_bank[slot]
+        self.period_matrix = matrix
+
+        self.reset()
+
+    def reset(self):
+        # History holds the input samples still needed by pending outputs, zero-primed
+        self.history = np.zeros(self.taps_per_phase - 1, dtype=np.float32)
+        self.history_start = -(self.taps_per_phase - 1)  # input index of history[0]
+        self.next_output = 0  # index of the next output sample to produce (multiple of up)
+
+    @property
+    def passthrough(self):
+        return self.up == self.down
+
+    def process(self, chunk):
+        """
+        Resample one block.
+        chunk: 1-D numpy array at input_rate. Returns float32 array at output_rate.
+        """
+        chunk = np.asarray(chunk, dtype=np.float32)
+        if self.passthrough:
+            return chunk
+
+        buf = np.concatenate((self.history, chunk))
+        received = self.history_start + len(buf)  # input index one past the last sample
+
+        # Emit whole periods whose last input sample has already arrived
+        period = self.next_output // self.up
+        last_offset = self.period_offsets[-1]
+        periods = max(0, (received - 1 - last_offset) // self.down + 1 - period)
+
+        if periods:
+            taps = self.taps_per_phase
+            stride = buf.strides[0]
+            first = period * self.down - self.history_start - (taps - 1)
+            if self.up == 1:
+                # Integer decimation (48k, 32k, 96k): every output is a strided view, no gather
+                windows = as_strided(buf[first:], shape=(periods, taps), strides=(stride * self.down, stride))
+                out = np.dot(windows, self.period_bank[0])
+            else:
+                spans = as_strided(buf[first:], shape=(periods, self.period_span), strides=(stride * self.down, stride))
+                out = np.dot(spans, self.period_matrix).reshape(-1)
+            self.next_output += periods * self.up
+        else:
+            out = np.empty(0, dtype=np.float32)
+
+        # Keep everything from the first sample the next output will need
+        keep_from = (self.next_output // self.up) * self.down - (self.taps_per_phase - 1)
+        keep_from = min(keep_from, received) - self.history_start
+        self.history = buf[keep_from:].copy()
+        self.history_start += keep_from
+        return out.astype(np.float32, copy=False)
@@ -0,0 +1,113 @@
+import numpy as np
+
+
+class AudioRingBuffer:
+    """
+    Fixed-capacity float32 ring buffer addressed by absolute sample position.
+
+    Every sample is stored twice (at i and i + capacity), so any span of up to
+    `capacity` samples is contiguous in memory and can be handed out as a
+    zero-copy view. Positions only ever grow; the oldest samples are
+    overwritten once more than `capacity` samples have been written.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = int(capacity)
+        self.storage = np.zeros(self.capacity * 2, dtype=np.float32)
+        self.write_pos = 0  # absolute position one past the newest sample
+
+    @property
+    def oldest_pos(self):
+        """Absolute position of the oldest sample still held."""
+        return max(0, self.write_pos - self.capacity)
+
+    def clear(self):
+        self.write_pos = 0
+
+    def write(self, samples):
+        samples = np.asarray(samples, dtype=np.float32)
+        n = len(samples)
+        if n > self.capacity:
+            # Only the newest `capacity` samples can survive anyway
+            self.write_pos += n - self.capacity
+            samples = samples[-self.capacity:]
+            n = self.capacity
+
+        start = self.write_pos % self.capacity
+        first = min(n, self.capacity - start)
+        rest = n - first
+        self.storage[start:start + first] = samples[:first]
+        self.storage[start + self.capacity:start + self.capacity + first] = samples[:first]
+        if rest:
+            self.storage[:rest] = samples[first:]
+            self.storage[self.capacity:self.capacity + rest] = samples[first:]
+        self.write_pos += n
+
+    def view(self, start, end):
+        """
+        Zero-copy view of samples [start, end).
+        Only valid until the span is overwritten by later writes; do not modify it.
+        """
+        if start < self.oldest_pos or end > self.write_pos or start > end:
+            raise IndexError(f"Span [{start}, {end}) not in buffer [{self.oldest_pos}, {self.write_pos})")
+        offset = start % self.capacity
+        return self.storage[offset:offset + (end - start)]
+
+    def copy(self, start, end):
+        """Contiguous copy of samples [start, end), safe to keep after later writes."""
+        return self.view(start, end).copy()
+
+
+class CaptureRing:
+    """
+    Preallocated single-producer/single-consumer ring between an audio
+    callback and the processing loop.
+
+    The producer copies each block into place and publishes it by advancing
+    write_pos; the consumer reads a zero-copy view of everything unread and
+    releases it by advancing read_pos. Each position is only moved by its own
+    side, after the samples it covers are written or used, so no lock is
+    needed. Samples are stored twice, as in AudioRingBuffer, so the unread
+    span is always contiguous.
+
+    A block that does not fit is refused whole; the source decides whether
+    that loses it (a device) or waits for room (a file). Either way a slow
+    consumer never grows memory.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = int(capacity)
+        self.storage = np.zeros(self.capacity * 2, dtype=np.float32)
+        self.write_pos = 0
+        self.read_pos = 0
+        self.high_water = 0 # most unread frames seen at once, written by the producer only
+
+    def free(self):
+        return self.capacity - (self.write_pos - self.read_pos)
+
+    def write(self, samples):
+        """Producer side. Copies samples in; returns False if they don't fit."""
+        n = len(samples)
+        if n > self.free():
+            return False
+        start = self.write_pos % self.capacity
+        first = min(n, self.capacity - start)
+        rest = n - first
+        self.storage[start:start + first] = samples[:first]
+        self.storage[start + self.capacity:start + self.capacity + first] = samples[:first]
+        if rest:
+            self.storage[:rest] = samples[first:]
+            self.storage[self.capacity:self.capacity + rest] = samples[first:]
+        self.write_pos += n # publish only once the samples are in place
+        self.high_water = max(self.high_water, self.write_pos - self.read_pos)
+        return True
+
+    def peek(self, max_samples):
+        """Consumer side. Zero-copy view of up to max_samples unread samples, valid until consume()."""
+        n = min(self.write_pos - self.read_pos, max_samples)
+        offset = self.read_pos % self.capacity
+        return self.storage[offset:offset + n]
+
+    def consume(self, n):
+        """Consumer side. Release the first n unread samples to the producer."""
+        self.read_pos += n
@@ -0,0 +1,85 @@
+import numpy as np
+
+
+def find_quiet_split(audio, frame_size=320):
+    """
+    Find the quietest point in audio to cut a segment without splitting a word.
+    audio: 1-D float32 array (typically the last couple of seconds of a segment).
+    frame_size: RMS frame length in samples (320 = 20ms at 16kHz).
+    Returns a sample offset into audio at the centre of the lowest-energy frame.
+    """
+    frames = len(audio) // frame_size
+    if frames == 0:
+        return len(audio)
+    # Align frames to the end, the newest audio matters most
+    framed = audio[len(audio) - frames * frame_size:].reshape(frames, frame_size)
+    rms = np.sqrt(np.mean(np.square(framed, dtype=np.float32), axis=1))
+    # Latest frame wins a tie, keeping the carried-over remainder short
+    quietest = frames - 1 - int(np.argmin(rms[::-1]))
+    return len(audio) - (frames - quietest) * frame_size + frame_size // 2
+
+
+class Segmenter:
+    """
+    Turns per-window VAD decisions into speech segments, with every threshold
+    in milliseconds.
+
+    end_silence_ms    silence after the last speech window that ends a segment
+                      (end-of-speech latency)
+    min_speech_ms     speech from onset to last speech window a segment needs
+                      to be transcribed, independent of end_silence_ms
+    preroll_ms        audio kept before the first speech window, so onsets the
+                      VAD fires late on are not cut
+    trailing_ms       silence kept after the last speech window; the rest of
+                      the end-of-speech silence is trimmed
+
+    Positions are absolute sample positions, as in AudioRingBuffer.
+    """
+
+    def __init__(self, sample_rate=16000, window=512, end_silence_ms=672, min_speech_ms=300,
+                 preroll_ms=200, trailing_ms=200):
+        to_samples = lambda ms: int(ms * sample_rate / 1000)
+        self.window = window
+        self.end_silence = to_samples(end_silence_ms)
+        self.min_speech = to_samples(min_speech_ms)
+        self.preroll = to_samples(preroll_ms)
+        self.trailing = to_samples(trailing_ms)
+        self.reset()
+
+    def reset(self):
+        self.active = False
+        self.start = 0 # start of the active segment, pre-roll included
+        self.speech_start = 0 # first speech window of the active segment
+        self.last_speech_end = 0 # end of its latest speech window
+        self.previous_end = 0 # pre-roll never reaches back into the previous segment
+
+    def update(self, pos, is_speech):
+        """
+        Feed the decision for the window starting at pos.
+        Returns "start" when a segment opens, "end" when its speech is over, else None.
+        """
+        if is_speech:
+            self.last_speech_end = pos + self.window
+            if not self.active:
+                self.active = True
+                self.speech_start = pos
+                self.start = max(self.previous_end, pos - self.preroll)
+                return "start"
+        elif self.active and pos + self.window - self.last_speech_end >= self.end_silence:
+            self.active = False
+            return "end"
+        return None
+
+    def end_pos(self, pos):
+        """Where the segment ends given audio up to pos: trailing silence beyond trailing_ms is trimmed."""
+        end = min(pos, max(self.start, self.last_speech_end + self.trailing))
+        self.previous_end = end
+        return end
+
+    def restart(self, pos):
+        """The active segment was cut at pos: what follows counts as a segment of its own, speech included."""
+        self.start = pos
+        self.speech_start = pos
+
+    def long_enough(self):
+        return self.last_speech_end - self.speech_start >= self.min_speech
@@ -0,0 +1,143 @@
+import threading
+import time
+import soundfile as sf
+from utils.logger import logger
+from utils.config_manager import config_manager
+
+# Sources push mono float32 blocks at their own sample_rate to on_audio(block)
+# and call on_finished() once there is no more audio. A source is started once.
+# The block may be a view of a buffer the source reuses, so on_audio copies what
+# it keeps before returning; it returns False when it had no room for the block.
+
+
+class DeviceSource:
+    """Live capture from a sounddevice input device."""
+
+    def __init__(self, device_index=None, block_size=1024):
+        import sounddevice as sd # Deferred: loads PortAudio
+        self.sd = sd
+        self.device_index = device_index
+        self.block_size = block_size
+        self.stream = None
+        # Audio lost before the processing loop saw it
+        self.overflows = 0 # callbacks PortAudio flagged with input overflow
+        self.dropped_frames = 0 # frames the consumer had no room for
+        # Query device info to get default sample rate
+        device_info = sd.query_devices(device_index, 'input')
+        self.sample_rate = int(device_info['default_samplerate'])
+        logger.info(f"Device {device_index} Native Sample Rate: {self.sample_rate}")
+
+    def start(self, on_audio, on_finished=None):
+        def callback(indata, frames, time, status):
+            # Runs on the PortAudio thread: count, don't log, and hand over a view
+            if status.input_overflow:
+                self.overflows += 1
+            if on_audio(indata[:, 0]) is False:
+                self.dropped_frames += frames
+
+        self.stream = self.sd.InputStream(
+            device=self.device_index,
+            channels=1,
+            samplerate=self.sample_rate,
+            blocksize=self.block_size,
+            callback=callback
+        )
+        self.stream.start()
+        logger.info(f"Audio listener started on device {self.device_index}")
+
+    def stop(self):
+        if self.stream:
+            try:
+                self.stream.stop()
+                self.stream.close()
+            except Exception:
+                pass
+            self.stream = None
+
+
+class FileSource:
+    """
+    Replays a WAV/FLAC recording as if it were being captured.
+
+    speed 1.0 paces blocks in real time, N plays N times faster and 0 feeds
+    the file as fast as the pipeline takes it. Unlike a device, a file never
+    loses audio: when the consumer has no room, replay waits for it.
+    Multi-channel files are downmixed to mono.
+    """
+
+    def __init__(self, path, block_size=1024, speed=1.0):
+        self.path = path
+        self.block_size = block_size
+        self.speed = max(0.0, float(speed))
+        info = sf.info(path)
+        self.sample_rate = int(info.samplerate)
+        self.duration = info.duration
+        self._stop = threading.Event()
+        self.thread = None
+        logger.info(f"Replaying {path} ({self.duration:.1f}s at {self.sample_rate} Hz, "
+                    f"speed {'max' if self.speed == 0 else f'{self.speed:g}x'})")
+
+    def start(self, on_audio, on_finished=None):
+        self.thread = threading.Thread(target=self._run, args=(on_audio, on_finished),
+                                       name="file-source", daemon=True)
+        self.thread.start()
+
+    def _run(self, on_audio, on_finished):
+        sent = 0
+        start = time.monotonic()
+        try:
+            with sf.SoundFile(self.path) as f:
+                for block in f.blocks(blocksize=self.block_size, dtype="float32", always_2d=True):
+                    sent += len(block)
+                    if self.speed > 0:
+                        # A device hands a block over once it has been captured
+                        delay = start + sent / (self.sample_rate * self.speed) - time.monotonic()
+                        if delay > 0 and self._stop.wait(delay):
+                            return
+                    if self._stop.is_set():
+                        return
+                    mono = block[:, 0] if block.shape[1] == 1 else block.mean(axis=1)
+                    while on_audio(mono) is False:
+                        if self._stop.wait(0.005):
+                            return
+        except Exception as e:
+            logger.error(f"Audio file replay failed: {e}")
+        elapsed = time.monotonic() - start
+        logger.info(f"Replay finished: {sent/self.sample_rate:.1f}s of audio in {elapsed:.1f}s")
+        if on_finished and not self._stop.is_set():
+            on_finished()
+
+    def stop(self):
+        self._stop.set()
+
+
+def create_source(block_size=1024):
+    """Build the input configured by audio_source ("device" or "file")."""
+    kind = config_manager.get("audio_source", "device")
+    if kind == "file":
+        return FileSource(config_manager.get("audio_file_path", ""), block_size,
+                          config_manager.get("replay_speed", 1.0))
+    if kind != "device":
+        logger.warning(f"Unknown audio_source '{kind}', using device.")
+    return DeviceSource(config_manager.get("audio_device_index"), block_size)
+
+
+def create_sources(block_size=1024):
+    """
+    Inputs to capture at once, as (source, label) pairs.
+    audio_streams lists them, e.g. [{"device": 1, "label": "Me"}, {"device": 7, "label": "Remote"}];
+    an entry may give "file" instead of "device". Without it, the single
+    audio_source input is used, unlabelled.
+    """
+    streams = config_manager.get("audio_streams") or []
+    if not streams:
+        return [(create_source(block_size), "")]
+    sources = []
+    for i, entry in enumerate(streams):
+        label = entry.get("label") or f"Stream {i + 1}"
+        if entry.get("file"):
+            source = FileSource(entry["file"], block_size, config_manager.get("replay_speed", 1.0))
+        else:
+            source = DeviceSource(entry.get("device"), block_size)
+        sources.append((source, label))
+    return sources
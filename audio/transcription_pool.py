@@ -0,0 +1,255 @@
+import threading
+import time
+from collections import deque
+import numpy as np
+from utils.logger import logger
+
+BACKPRESSURE_POLICIES = ("merge", "drop_oldest")
+
+# Marks a sequence number whose job was merged into its neighbour
+_SKIPPED = object()
+
+
+class TranscriptionJob:
+    def __init__(self, seq, audio, meta=None, preview=False, group=None):
+        self.seq = seq
+        self.audio = audio
+        self.meta = meta
+        self.preview = preview
+        self.group = group
+        self.enqueued_at = time.monotonic()
+
+
+class TranscriptionPool:
+    """
+    Bounded queue of finished speech segments consumed by worker threads.
+
+    transcribe_fn(audio, meta) runs on a worker thread. Jobs may finish out of order when several workers run, but results are
+    handed to on_result(text, meta) strictly in submission order. With a
+    batch_fn(audios, metas) and max_batch > 1, a worker takes up to max_batch
+    waiting jobs at once (waiting up to batch_wait seconds for a batch to
+    fill) and batch_fn returns their texts in the same order. When more
+    than max_pending jobs are waiting, the backpressure policy either merges
+    the oldest waiting segment into the next one of the same group (audio
+    stream) or drops the oldest one (its slot is then delivered with text
+    None). Preview jobs (provisional decodes of a segment still in progress)
+    are always dropped first.
+
+    A pool is started once; AudioListener builds a fresh one per session so a
+    stopped pool can finish draining in the background.
+    """
+
+    def __init__(self, transcribe_fn, on_result, workers=1, max_pending=4, policy="merge",
+                 batch_fn=None, max_batch=1, batch_wait=0.0):
+        if policy not in BACKPRESSURE_POLICIES:
+            logger.warning(f"Unknown backpressure policy '{policy}', using 'merge'.")
+            policy = "merge"
+        self.transcribe_fn = transcribe_fn
+        self.on_result = on_result
+        self.num_workers = max(1, int(workers))
+        self.max_pending = max(1, int(max_pending))
+        self.policy = policy
+        self.batch_fn = batch_fn
+        self.max_batch = max(1, int(max_batch)) # may change with the engine, read per batch
+        self.batch_wait = batch_wait
+
+        self._pending = deque()
+        self._cond = threading.Condition()
+        self._deliver_lock = threading.Lock()
+        self._results = {}
+        self._next_seq = 0
+        self._next_deliver = 0
+        self._in_flight = 0
+        self._workers = []
+        self.running = False
+        self.draining = False
+
+        # Counters exposed through stats()
+        self.completed = 0
+        self.batches = 0
+        self.merged = 0
+        self.dropped = 0
+        self.max_depth = 0
+        self.last_wait = 0.0
+        self.max_wait = 0.0
+        self.total_wait = 0.0
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.draining = False
+        for i in range(self.num_workers):
+            worker = threading.Thread(target=self._worker_loop, name=f"transcriber-{i}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def ensure_workers(self, count):
+        """Grow the pool to at least count workers, e.g. for an engine with more requests in flight."""
+        with self._cond:
+            if not self.running or self.draining:
+                return
+            for i in range(len(self._workers), count):
+                worker = threading.Thread(target=self._worker_loop, name=f"transcriber-{i}", daemon=True)
+                worker.start()
+                self._workers.append(worker)
+            self.num_workers = max(self.num_workers, count)
+
+    def stop(self, drain=True):
+        """Stop the workers. With drain=True, jobs already queued are still transcribed."""
+        with self._cond:
+            if drain:
+                self.draining = True
+            else:
+                self.running = False
+                for job in self._pending:
+                    self._results[job.seq] = (None, job.meta)
+                self._pending.clear()
+            self._cond.notify_all()
+        self._workers = []
+        self._deliver_ready()
+
+    def idle(self):
+        """True when nothing is queued or being transcribed."""
+        with self._cond:
+            return not self._pending and self._in_flight == 0
+
+    def wait_idle(self, timeout=None):
+        """Block until every submitted job is transcribed and delivered. Returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._pending or self._in_flight:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        # Results may still be on their way to on_result, finish handing them over
+        self._deliver_ready()
+        return True
+
+    def submit(self, audio, meta=None, preview=False, group=None):
+        with self._cond:
+            job = TranscriptionJob(self._next_seq, audio, meta, preview, group)
+            self._next_seq += 1
+            self._pending.append(job)
+            if len(self._pending) > self.max_pending:
+                self._apply_backpressure()
+            self.max_depth = max(self.max_depth, len(self._pending))
+            self._cond.notify_all() # wait_idle() shares the condition with the workers
+        return job.seq
+
+    def _apply_backpressure(self):
+        # Called with self._cond held
+        previews = [job for job in self._pending if job.preview]
+        if previews:
+            # Provisional text is worthless once it is stale, never merge it
+            self._pending.remove(previews[0])
+            self._results[previews[0].seq] = (None, previews[0].meta)
+            return
+
+        if self.policy == "drop_oldest":
+            oldest = self._pending.popleft()
+            self.dropped += 1
+            self._results[oldest.seq] = (None, oldest.meta)
+            logger.warning(f"Transcription backlog full, dropped segment #{oldest.seq}.")
+            return
+
+        # Fold the oldest segment that has a later one from the same stream into
+        # it; the merged job keeps the earlier enqueue time. Audio of different
+        # streams is never mixed, so with one job per stream the queue just grows.
+        jobs = list(self._pending)
+        for i, oldest in enumerate(jobs):
+            following = next((job for job in jobs[i + 1:] if job.group == oldest.group), None)
+            if following is not None:
+                break
+        else:
+            return
+        self._pending.remove(oldest)
+        following.audio = np.concatenate((oldest.audio, following.audio))
+        following.enqueued_at = oldest.enqueued_at
+        self.merged += 1
+        self._results[oldest.seq] = _SKIPPED
+        logger.warning("Transcription backlog full, merged the two oldest segments.")
+
+    def stats(self):
+        with self._cond:
+            waits = self.completed or 1
+            return {
+                "depth": len(self._pending),
+                "in_flight": self._in_flight,
+                "max_depth": self.max_depth,
+                "completed": self.completed,
+                "batches": self.batches,
+                "merged": self.merged,
+                "dropped": self.dropped,
+                "last_wait": self.last_wait,
+                "avg_wait": self.total_wait / waits,
+                "max_wait": self.max_wait,
+            }
+
+    def _worker_loop(self):
+        while True:
+            with self._cond:
+                while self.running and not self.draining and not self._pending:
+                    self._cond.wait()
+                if not self.running or (self.draining and not self._pending):
+                    return
+                batch_size = self.max_batch if self.batch_fn else 1
+                if batch_size > 1 and self.batch_wait > 0 and not self.draining:
+                    # Give a batch a moment to fill before dispatching a lone segment
+                    deadline = time.monotonic() + self.batch_wait
+                    while self.running and 0 < len(self._pending) < batch_size:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._cond.wait(remaining)
+                    if not self._pending:
+                        continue # another worker took them
+                jobs = [self._pending.popleft() for _ in range(min(batch_size, len(self._pending)))]
+                self._in_flight += len(jobs)
+                now = time.monotonic()
+                for job in jobs:
+                    wait = now - job.enqueued_at
+                    self.last_wait = wait
+                    self.max_wait = max(self.max_wait, wait)
+                    self.total_wait += wait
+                depth = len(self._pending)
+
+            if len(jobs) == 1:
+                logger.debug(f"Transcription job #{jobs[0].seq} waited {wait:.2f}s (queue depth {depth})")
+            else:
+                logger.debug(f"Transcription jobs #{jobs[0].seq}-#{jobs[-1].seq} batched, oldest waited "
+                             f"{now - jobs[0].enqueued_at:.2f}s (queue depth {depth})")
+            try:
+                if len(jobs) == 1:
+                    texts = [self.transcribe_fn(jobs[0].audio, jobs[0].meta)]
+                else:
+                    texts = self.batch_fn([job.audio for job in jobs], [job.meta for job in jobs])
+            except Exception as e:
+                logger.error(f"Transcription worker error: {e}")
+                texts = [""] * len(jobs)
+
+            with self._cond:
+                self._in_flight -= len(jobs)
+                self.completed += len(jobs)
+                self.batches += len(jobs) > 1
+                for job, text in zip(jobs, texts):
+                    self._results[job.seq] = (text, job.meta)
+                self._cond.notify_all()
+            self._deliver_ready()
+
+    def _deliver_ready(self):
+        # One thread at a time walks the results forward in sequence order
+        with self._deliver_lock:
+            while True:
+                with self._cond:
+                    result = self._results.pop(self._next_deliver, None)
+                    if result is None:
+                        return
+                    self._next_deliver += 1
+                if result is _SKIPPED:
+                    continue
+                try:
+                    self.on_result(*result)
+                except Exception as e:
+                    logger.error(f"Transcript delivery error: {e}")
@@ -1,27 +1,40 @@
+import copy
 import torch
 import numpy as np
 import os
 from utils.logger import logger
+from utils.config_manager import config_manager
+
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'assets')
 
 class SileroVAD:
-    def __init__(self):
+    def __init__(self, backend=None):
         self.model = None
+        self.session = None # ONNX Runtime session when backend is "onnx"
         self.utils = None
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        self.backend = backend or config_manager.get("vad_backend", "torch")
+        self.threshold = 0.5
         self.load_model()
 
     def load_model(self):
+        if self.backend == "onnx" and self.load_onnx_model():
+            return
+        self.backend = "torch"
+        self.load_torch_model()
+
+    def load_torch_model(self):
         try:
             logger.info(f"Loading Silero VAD on {self.device}...")
-            
+
             # Check for local model first (for EXE)
-            local_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'assets', 'silero_vad.jit')
+            local_path = os.path.join(ASSETS_DIR, 'silero_vad.jit')
             if os.path.exists(local_path):
                 logger.info(f"Loading local VAD model from {local_path}")
                 self.model = torch.jit.load(local_path)
                 self.model.to(self.device)
                 # Utils are not loaded with JIT, but we only use the model for inference
-                self.utils = None 
+                self.utils = None
             else:
                 # Fallback to Hub (for Dev)
                 logger.info("Local model not found, downloading from Hub...")
@@ -30,30 +43,119 @@ class SileroVAD:
                                                         force_reload=False,
                                                         onnx=False)
                 self.model.to(self.device)
-            
+            self.model.eval()
+
             logger.info("Silero VAD loaded successfully.")
         except Exception as e:
             logger.error(f"Failed to load Silero VAD: {e}")
 
-    def is_speech(self, audio_chunk, sample_rate=16000):
+    def load_onnx_model(self):
+        """Load assets/silero_vad.onnx with ONNX Runtime. Returns False to fall back to torch."""
+        local_path = os.path.join(ASSETS_DIR, 'silero_vad.onnx')
+        if not os.path.exists(local_path):
+            logger.warning(f"ONNX VAD model not found at {local_path}, using torch backend.")
+            return False
+        try:
+            import onnxruntime as ort
+        except ImportError:
+            logger.warning("onnxruntime is not installed, using torch backend.")
+            return False
+
+        try:
+            threads = config_manager.get("vad_threads", 1)
+            options = ort.SessionOptions()
+            options.intra_op_num_threads = threads
+            options.inter_op_num_threads = 1
+            options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            self.session = ort.InferenceSession(local_path, sess_options=options,
+                                                providers=["CPUExecutionProvider"])
+
+            inputs = {i.name for i in self.session.get_inputs()}
+            if inputs != {"input", "state", "sr"}:
+                logger.warning(f"Unsupported ONNX VAD model inputs {sorted(inputs)}, expected Silero v5.")
+                self.session = None
+                return False
+
+            self.reset_states()
+            logger.info(f"Silero VAD loaded with ONNX Runtime ({threads} intra-op threads).")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to load ONNX VAD: {e}")
+            self.session = None
+            return False
+
+    def reset_states(self):
+        """Forget the recurrent state, e.g. before starting a new stream."""
+        if self.session is not None:
+            self._state = np.zeros((2, 1, 128), dtype=np.float32)
+            self._context = None
+        elif self.model is not None and hasattr(self.model, "reset_states"):
+            self.model.reset_states()
+
+    def fork(self):
+        """A detector with its own recurrent state, for another audio stream."""
+        if self.session is not None:
+            # The ONNX session is stateless and thread-safe, only the state is per stream
+            other = copy.copy(self)
+            other.reset_states()
+            return other
+        # The JIT model keeps its state internally, so each stream needs its own copy
+        return SileroVAD(backend=self.backend)
+
+    def speech_probs(self, windows, sample_rate=16000):
         """
-        Check if the audio chunk contains speech.
-        audio_chunk: numpy array of float32
+        Score consecutive windows in one call.
+        windows: float32 array of shape [n, 512] (16kHz) in capture order.
+        Returns a numpy array of n speech probabilities.
+
+        Silero is recurrent, so windows are still fed one after another to keep
+        its state correct; batching saves the per-call conversion and dispatch.
         """
-        if self.model is None:
-            return False
-        
-        # Convert numpy array to tensor
-        tensor = torch.from_numpy(audio_chunk).to(self.device)
-        
-        # Add batch dimension if needed (Silero expects [batch, time] or [time])
-        # Usually for single chunk streaming, just 1D is fine or 2D [1, T]
-        if len(tensor.shape) == 1:
-            tensor = tensor.unsqueeze(0)
+        windows = np.ascontiguousarray(windows, dtype=np.float32)
+        if windows.ndim == 1:
+            windows = windows[None, :]
+        if len(windows) == 0:
+            return np.zeros(0, dtype=np.float32)
 
         try:
-            speech_prob = self.model(tensor, sample_rate).item()
-            return speech_prob > 0.5
+            if self.session is not None:
+                return self._onnx_probs(windows, sample_rate)
+            if self.model is not None:
+                return self._torch_probs(windows, sample_rate)
         except Exception as e:
             logger.error(f"VAD Error: {e}")
+        return np.zeros(len(windows), dtype=np.float32)
+
+    def _torch_probs(self, windows, sample_rate):
+        with torch.inference_mode():
+            tensor = torch.from_numpy(windows).to(self.device)
+            probs = [self.model(tensor[i:i + 1], sample_rate) for i in range(len(tensor))]
+            return torch.cat(probs).flatten().cpu().numpy()
+
+    def _onnx_probs(self, windows, sample_rate):
+        # The ONNX export is stateless: carry the LSTM state and the trailing
+        # context samples of the previous window ourselves, as silero's wrapper does
+        context_size = 64 if sample_rate == 16000 else 32
+        if self._context is None:
+            self._context = np.zeros(context_size, dtype=np.float32)
+        sr = np.array(sample_rate, dtype=np.int64)
+
+        probs = np.empty(len(windows), dtype=np.float32)
+        frame = np.empty((1, context_size + windows.shape[1]), dtype=np.float32)
+        for i, window in enumerate(windows):
+            frame[0, :context_size] = self._context
+            frame[0, context_size:] = window
+            out, self._state = self.session.run(None, {"input": frame, "state": self._state, "sr": sr})
+            probs[i] = out[0, 0]
+            self._context = window[-context_size:].copy()
+        return probs
+
+    def is_speech(self, audio_chunk, sample_rate=16000):
+        """
+        Check if the audio chunk contains speech.
+        audio_chunk: numpy array of float32
+        """
+        if self.model is None and self.session is None:
             return False
+        return bool(self.speech_probs(audio_chunk, sample_rate)[0] > self.threshold)
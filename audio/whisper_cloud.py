@@ -1,46 +1,126 @@
+import io
+import random
+import threading
+import time
 import openai
-from openai import OpenAI
-import os
-import tempfile
 import soundfile as sf
 from utils.logger import logger
 from utils.config_manager import config_manager
+from utils.openai_client import openai_clients
+
+# cloud_audio_format -> (soundfile format, subtype, upload file name, MIME type)
+UPLOAD_FORMATS = {
+    "wav": ("WAV", "PCM_16", "audio.wav", "audio/wav"),
+    "flac": ("FLAC", "PCM_16", "audio.flac", "audio/flac"),
+    "opus": ("OGG", "OPUS", "audio.ogg", "audio/ogg"),
+}
+
+# Failures worth another attempt: network errors, timeouts, 429 and 5xx
+TRANSIENT_ERRORS = (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError)
 
 class WhisperCloud:
     def __init__(self):
-        self.api_key = config_manager.get("openai_api_key", "")
-        self.client = None
-        if self.api_key:
-            self.client = OpenAI(api_key=self.api_key)
+        self.concurrency = max(1, config_manager.get("cloud_max_in_flight", 3))
+        self.request_timeout = config_manager.get("cloud_request_timeout", 30.0) # deadline incl. retries
+        self.max_retries = config_manager.get("cloud_max_retries", 3)
+        self.backoff_base = 0.5
+        self.backoff_cap = 8.0
+        self.in_flight = threading.BoundedSemaphore(self.concurrency)
+        self.clients = (None, None) # (shared client, its retry-less copy), swapped as one
+
+        self.audio_format = config_manager.get("cloud_audio_format", "flac")
+        if self.audio_format not in UPLOAD_FORMATS:
+            logger.warning(f"Unknown cloud_audio_format '{self.audio_format}', using flac.")
+            self.audio_format = "flac"
+        if self.audio_format == "opus" and "OPUS" not in sf.available_subtypes("OGG"):
+            logger.warning("This libsndfile build cannot encode Opus, using flac.")
+            self.audio_format = "flac"
+
+        # Upload accounting, compared against the 16-bit PCM WAV uploaded before;
+        # segments are encoded on several pool threads at once
+        self.stats_lock = threading.Lock()
+        self.segments = 0
+        self.upload_bytes = 0
+        self.raw_bytes = 0
+        self.encode_seconds = 0.0
+
+    def get_client(self):
+        # The app-wide client and its keep-alive pool (shared with the LLM);
+        # retries are ours so they respect the per-request deadline
+        client = openai_clients.get()
+        if client is None:
+            return None
+        base, own = self.clients
+        if base is not client:
+            own = client.with_options(max_retries=0)
+            self.clients = (client, own)
+        return own
+
+    def encode(self, audio_data, sample_rate=16000):
+        """Encode a segment in memory. Returns (file name, bytes, MIME type)."""
+        fmt, subtype, filename, mime = UPLOAD_FORMATS[self.audio_format]
+        start = time.perf_counter()
+        buffer = io.BytesIO()
+        sf.write(buffer, audio_data, sample_rate, format=fmt, subtype=subtype)
+        data = buffer.getvalue()
+        elapsed = time.perf_counter() - start
 
-    def update_api_key(self, key):
-        self.api_key = key
-        self.client = OpenAI(api_key=key)
+        raw = len(audio_data) * 2
+        with self.stats_lock:
+            self.segments += 1
+            self.upload_bytes += len(data)
+            self.raw_bytes += raw
+            self.encode_seconds += elapsed
+        logger.info(f"Encoded {len(audio_data)/sample_rate:.2f}s as {self.audio_format}: "
+                    f"{len(data)/1024:.1f} KiB ({len(data)/raw:.0%} of 16-bit PCM) in {elapsed*1000:.1f} ms")
+        return filename, data, mime
+
+    def request_with_retries(self, client, upload):
+        deadline = time.monotonic() + self.request_timeout
+        attempt = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            try:
+                return client.audio.transcriptions.create(
+                    model="whisper-1",
+                    file=upload,
+                    timeout=max(remaining, 0.1)
+                )
+            except TRANSIENT_ERRORS as e:
+                attempt += 1
+                # Full jitter keeps concurrent retries from hitting the server in lockstep
+                delay = random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+                if attempt > self.max_retries or time.monotonic() + delay >= deadline:
+                    raise
+                logger.warning(f"Cloud transcription attempt {attempt} failed ({e}), retrying in {delay:.2f}s")
+                time.sleep(delay)
+
+    def stats(self):
+        with self.stats_lock:
+            return {
+                "format": self.audio_format,
+                "segments": self.segments,
+                "upload_bytes": self.upload_bytes,
+                "raw_bytes": self.raw_bytes,
+                "encode_seconds": self.encode_seconds,
+            }
 
     def transcribe(self, audio_data, sample_rate=16000):
         """
         Transcribe audio data using OpenAI API.
         audio_data: numpy array of float32
         """
-        if not self.client:
+        client = self.get_client()
+        if not client:
             logger.warning("OpenAI API Key not set for Cloud Whisper.")
             return "Error: API Key missing"
 
         try:
-            # Save to temporary wav file
-            with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp:
-                tmp_filename = tmp.name
-            
-            sf.write(tmp_filename, audio_data, sample_rate)
-
-            with open(tmp_filename, "rb") as audio_file:
-                transcript = self.client.audio.transcriptions.create(
-                    model="whisper-1", 
-                    file=audio_file
-                )
-            
-            os.remove(tmp_filename)
-            
+            # Encoded in memory and passed straight to the request, no temp file
+            upload = self.encode(audio_data, sample_rate)
+            with self.in_flight:
+                transcript = self.request_with_retries(client, upload)
+
             text = transcript.text.strip()
             return text
         except Exception as e:
@@ -0,0 +1,53 @@
+from faster_whisper import WhisperModel
+import ctranslate2
+from utils.logger import logger
+from utils.config_manager import config_manager
+
+class WhisperFaster:
+    """Whisper on CTranslate2 (faster-whisper), int8 by default for CPU-only machines."""
+
+    def __init__(self):
+        self.model = None
+        # Asked of CTranslate2 itself, so this engine does not need torch installed
+        self.device = "cuda" if ctranslate2.get_cuda_device_count() > 0 else "cpu"
+        self.current_model_size = config_manager.get("whisper_model_size", "small")
+        self.compute_type = config_manager.get("faster_whisper_compute_type", "int8")
+        self.cpu_threads = config_manager.get("faster_whisper_threads", 0) # 0 = CTranslate2 default
+        # CTranslate2 runs one transcription per worker concurrently
+        self.num_workers = config_manager.get("transcription_workers", 1)
+        self.load_model()
+
+    def load_model(self):
+        try:
+            logger.info(f"Loading faster-whisper ({self.current_model_size}, {self.compute_type}) on {self.device}...")
+            self.model = WhisperModel(
+                self.current_model_size,
+                device=self.device,
+                compute_type=self.compute_type,
+                cpu_threads=self.cpu_threads,
+                num_workers=self.num_workers
+            )
+            logger.info("faster-whisper loaded successfully.")
+        except Exception as e:
+            logger.error(f"Failed to load faster-whisper: {e}")
+
+    def close(self):
+        self.model = None
+
+    def transcribe(self, audio_data, sample_rate=16000):
+        """
+        Transcribe audio data.
+        audio_data: numpy array of float32 (16kHz mono)
+        """
+        if self.model is None:
+            return ""
+
+        try:
+            # Segments are produced lazily, joining them runs the decode.
+            # Greedy, like WhisperLocal's default decode, so the engines compare like for like
+            segments, _ = self.model.transcribe(audio_data, beam_size=1)
+            text = " ".join(segment.text.strip() for segment in segments)
+            return text.strip()
+        except Exception as e:
+            logger.error(f"faster-whisper Transcription Error: {e}")
+            return ""
@@ -1,11 +1,14 @@
 import whisper
 import torch
+import threading
 from utils.logger import logger
 from utils.config_manager import config_manager
 
 class WhisperLocal:
     def __init__(self):
         self.model = None
+        # whisper installs per-call hooks on the model, so calls must not overlap
+        self.lock = threading.Lock()
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
         self.current_model_size = config_manager.get("whisper_model_size", "small")
         self.load_model()
@@ -18,7 +21,45 @@ class WhisperLocal:
         except Exception as e:
             logger.error(f"Failed to load Local Whisper: {e}")
 
-    def transcribe(self, audio_data):
+    def close(self):
+        self.model = None
+
+    def transcribe_batch(self, audios, sample_rate=16000):
+        """
+        Transcribe several segments with one encoder and decoder pass.
+        Returns one text per segment, in order. Segments that need more than
+        a plain greedy decode (over 30s, or output that transcribe() would
+        retry at a higher temperature) fall back to transcribe().
+        """
+        if self.model is None:
+            return [""] * len(audios)
+
+        texts = [None] * len(audios)
+        batch = [i for i, audio in enumerate(audios) if len(audio) <= whisper.audio.N_SAMPLES]
+        if len(batch) > 1:
+            try:
+                # Same features transcribe() computes for a single 30s window
+                mel = torch.stack([
+                    whisper.log_mel_spectrogram(audios[i], self.model.dims.n_mels,
+                                                padding=whisper.audio.N_SAMPLES)[:, :whisper.audio.N_FRAMES]
+                    for i in batch
+                ]).to(self.device)
+                options = whisper.DecodingOptions(fp16=(self.device == "cuda"), without_timestamps=True)
+                with self.lock:
+                    results = whisper.decode(self.model, mel, options)
+                for i, result in zip(batch, results):
+                    # transcribe()'s thresholds: silence is skipped, poor decodes are retried
+                    if result.no_speech_prob > 0.6 and result.avg_logprob < -1.0:
+                        texts[i] = ""
+                    elif result.compression_ratio <= 2.4 and result.avg_logprob >= -1.0:
+                        texts[i] = result.text.strip()
+            except Exception as e:
+                logger.error(f"Local batch transcription error, transcribing one by one: {e}")
+
+        return [self.transcribe(audio, sample_rate) if text is None else text
+                for audio, text in zip(audios, texts)]
+
+    def transcribe(self, audio_data, sample_rate=16000):
         """
         Transcribe audio data.
         audio_data: numpy array of float32 (16kHz mono)
@@ -28,7 +69,8 @@ class WhisperLocal:
         
         try:
             # Whisper expects float32 audio
-            result = self.model.transcribe(audio_data, fp16=(self.device == "cuda"))
+            with self.lock:
+                result = self.model.transcribe(audio_data, fp16=(self.device == "cuda"))
             text = result.get("text", "").strip()
             return text
         except Exception as e:
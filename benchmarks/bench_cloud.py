@@ -0,0 +1,87 @@
+"""
+Cloud transcription throughput against the local stub server.
+
+Pushes synthetic segments through TranscriptionPool + WhisperCloud the way
+AudioListener does, once with one request in flight and once with
+cloud_max_in_flight, and checks results still arrive in submission order.
+No network access or API key is needed.
+
+Run from the project root:
+    python -m benchmarks.bench_cloud
+    python -m benchmarks.bench_cloud --segments 24 --delay 0.5 --fail-rate 0.2 --in-flight 4
+"""
+import argparse
+import time
+import numpy as np
+from audio.transcription_pool import TranscriptionPool
+from benchmarks.cloud_stub_server import CloudStubServer
+from utils.config_manager import config_manager
+
+SAMPLE_RATE = 16000
+
+
+def run(server, segments, in_flight):
+    # In-memory overrides only; config.json is not written
+    config_manager.config.update({
+        "openai_api_key": "stub",
+        "openai_base_url": server.base_url,
+        "cloud_max_in_flight": in_flight,
+        "cloud_audio_format": "flac",
+    })
+    from audio.whisper_cloud import WhisperCloud
+    engine = WhisperCloud()
+
+    order = []
+    pool = TranscriptionPool(lambda audio, meta: engine.transcribe(audio, SAMPLE_RATE),
+                             lambda text, meta: order.append((meta, text)),
+                             workers=engine.concurrency, max_pending=len(segments))
+    pool.start()
+    start = time.perf_counter()
+    for i, audio in enumerate(segments):
+        pool.submit(audio, i)
+    while not pool.idle() or len(order) < len(segments):
+        time.sleep(0.01)
+    elapsed = time.perf_counter() - start
+    pool.stop()
+
+    errors = sum(1 for _, text in order if text is None or text.startswith("Error"))
+    return {
+        "in_flight": in_flight,
+        "seconds": elapsed,
+        "segments_per_second": len(segments) / elapsed,
+        "in_order": [meta for meta, _ in order] == list(range(len(segments))),
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--segments", type=int, default=12)
+    parser.add_argument("--seconds", type=float, default=3.0, help="length of each segment")
+    parser.add_argument("--delay", type=float, default=0.4, help="stub server latency per request")
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--in-flight", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    segments = [(0.1 * rng.standard_normal(int(args.seconds * SAMPLE_RATE))).astype(np.float32)
+                for _ in range(args.segments)]
+
+    print(f"{args.segments} x {args.seconds:.1f}s segments, stub latency {args.delay:.2f}s, "
+          f"fail rate {args.fail_rate:.0%}")
+    print(f"{'in flight':>9} {'seconds':>8} {'seg/s':>7} {'order':>6} {'errors':>6} "
+          f"{'requests':>8} {'503s':>5} {'peak':>5} {'conns':>5}")
+    for in_flight in sorted({1, args.in_flight}):
+        server = CloudStubServer(delay=args.delay, fail_rate=args.fail_rate).start()
+        try:
+            result = run(server, segments, in_flight)
+        finally:
+            server.stop()
+        s = server.stats()
+        print(f"{result['in_flight']:>9} {result['seconds']:>8.2f} {result['segments_per_second']:>7.2f} "
+              f"{'ok' if result['in_order'] else 'WRONG':>6} {result['errors']:>6} "
+              f"{s['requests']:>8} {s['failures']:>5} {s['max_concurrent']:>5} {s['connections']:>5}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Energy gate in front of Silero: VAD CPU time and segments with the gate off and on.
+
+Each signal is replayed through AudioListener at full speed (stub engine,
+real Silero VAD) once without and once with the gate. Reported per signal:
+the CPU seconds spent in the VAD, the share of windows the gate skipped,
+and the segments found (generated signals also give the true utterance
+count: Silero's recurrent state drifts over long noisy pauses, so skipping
+them can change, and usually improves, its decisions).
+
+Signals:
+  mic        generated meeting speech with long pauses over a mic noise floor
+  loopback   the same speech with digitally silent pauses (system audio capture)
+  fixtures   any WAV/FLAC in benchmarks/fixtures/ (or --fixtures); the bundled
+             synthetic_meeting_48k.flac has two talkers in a reverberant room
+             over hum, with short pauses that leave the gate little to skip
+
+Run from the project root:
+    python -m benchmarks.bench_energy_gate
+"""
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+import soundfile as sf
+from benchmarks.signals import speech_like
+from benchmarks.run_all import SAMPLE_RATE, fixture_paths, run_listener, use_stub_engine
+from utils.config_manager import config_manager
+from utils.tracing import tracer
+
+
+class TimedVAD:
+    """Wraps a VAD and counts the windows it scores and the CPU time it takes."""
+
+    def __init__(self, vad):
+        self.vad = vad
+        self.threshold = vad.threshold
+        self.windows = 0
+        self.cpu_seconds = 0.0
+
+    def reset_states(self):
+        self.vad.reset_states()
+
+    def speech_probs(self, windows, sample_rate=16000):
+        start = time.thread_time()
+        probs = self.vad.speech_probs(windows, sample_rate)
+        self.cpu_seconds += time.thread_time() - start
+        self.windows += len(windows)
+        return probs
+
+
+def meeting_signals(seconds, directory):
+    """
+    Generated files of a speaker who is mostly listening, as heard from a mic
+    and from loopback. Returns {name: (path, utterance count)}.
+    """
+    signals = {}
+    for name, noise in (("mic", 0.003), ("loopback", 0.0)):
+        audio, intervals = speech_like(seconds, SAMPLE_RATE, seed=4, utterance=(1.5, 5.0), pause=(3.0, 10.0),
+                                       noise=noise)
+        path = os.path.join(directory, f"{name}.flac")
+        sf.write(path, audio, SAMPLE_RATE)
+        signals[name] = (path, len(intervals))
+    return signals
+
+
+def compare_gate(path, vad):
+    """Replay path without and with the energy gate. Returns a result dict."""
+    runs = {}
+    for enabled in (False, True):
+        config_manager.config["energy_gate"] = enabled
+        timed = TimedVAD(vad)
+        _, lengths = run_listener(path, timed)
+        runs[enabled] = (timed, lengths)
+    (off, off_lengths), (on, on_lengths) = runs[False], runs[True]
+    # Metric names follow run_all's conventions so --compare can judge them
+    result = {
+        "ungated_vad_cpu_seconds": off.cpu_seconds,
+        "vad_cpu_seconds": on.cpu_seconds,
+        "windows_skipped": round(1 - on.windows / off.windows, 4) if off.windows else 0.0,
+        "ungated_segments": len(off_lengths),
+        "segments": len(on_lengths),
+    }
+    if len(off_lengths) == len(on_lengths) and off_lengths:
+        result["length_diff_ms"] = float(np.max(np.abs(np.array(off_lengths) - on_lengths))) * 1000
+    return result
+
+
+def run(seconds, fixtures, directory):
+    from audio.vad import SileroVAD
+    use_stub_engine()
+    vad = SileroVAD()
+    results = {}
+    for name, (path, utterances) in meeting_signals(seconds, directory).items():
+        results[name] = compare_gate(path, vad)
+        results[name]["expected_segments"] = utterances
+    for fixture in fixtures:
+        results[os.path.basename(fixture)] = compare_gate(fixture, vad)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=120.0, help="length of the generated signals")
+    parser.add_argument("--fixtures", nargs="+", help="recordings to use instead of benchmarks/fixtures/")
+    args = parser.parse_args()
+
+    tracer.enabled = False
+    config_manager.save_config = lambda: None
+    with tempfile.TemporaryDirectory() as workdir:
+        results = run(args.seconds, fixture_paths(args), workdir)
+
+    print(f"{'signal':<28} {'VAD CPU off':>11} {'on':>8} {'saved':>7} {'skipped':>8}  segments off/on")
+    for name, r in results.items():
+        off, on = r["ungated_vad_cpu_seconds"], r["vad_cpu_seconds"]
+        saved = 1 - on / off if off else 0.0
+        line = (f"{name:<28} {off:>10.2f}s {on:>7.2f}s {saved:>7.0%} {r['windows_skipped']:>8.0%}  "
+                f"{r['ungated_segments']}/{r['segments']}")
+        if "expected_segments" in r:
+            line += f" of {r['expected_segments']}"
+        if "length_diff_ms" in r:
+            line += f" (max length diff {r['length_diff_ms']:.0f} ms)"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Startup cost: import time per module, time to first paint of the GUI and
+time until headless.py is listening.
+
+Each module is imported in a fresh interpreter so shared dependencies are
+not double counted. Time to first paint launches main.py with
+MEETING_ASSISTANT_STARTUP_BENCH=1, which prints a startup report as soon
+as the overlay has painted and then exits; headless.py does the same once
+capture is running (on a short silent file, so no device is needed).
+
+Run from the project root:
+    python -m benchmarks.bench_startup
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+import soundfile as sf
+
+MODULES = [
+    "numpy",
+    "scipy.signal",
+    "torch",
+    "whisper",
+    "openai",
+    "sounddevice",
+    "markdown",
+    "keyboard",
+    "PySide6.QtWidgets",
+    "ui.overlay",
+    "ui.settings_window",
+    "audio.audio_listener",
+    "llm.translator",
+    "headless",
+]
+
+IMPORT_SNIPPET = (
+    "import time; t = time.perf_counter(); import {module}; "
+    "print((time.perf_counter() - t) * 1000)"
+)
+
+
+def import_time_ms(module):
+    proc = subprocess.run([sys.executable, "-c", IMPORT_SNIPPET.format(module=module)],
+                          capture_output=True, text=True, cwd=os.getcwd())
+    if proc.returncode != 0:
+        return None
+    return float(proc.stdout.strip().splitlines()[-1])
+
+
+def startup_report(cmd, timeout):
+    env = dict(os.environ, MEETING_ASSISTANT_STARTUP_BENCH="1")
+    start = time.perf_counter()
+    proc = subprocess.run(cmd, capture_output=True, text=True,
+                          cwd=os.getcwd(), env=env, timeout=timeout)
+    wall_ms = (time.perf_counter() - start) * 1000
+    for line in proc.stdout.splitlines():
+        if line.startswith("STARTUP_REPORT "):
+            return wall_ms, json.loads(line[len("STARTUP_REPORT "):])
+    return wall_ms, None
+
+
+def first_paint(timeout):
+    return startup_report([sys.executable, "main.py"], timeout)
+
+
+def headless_listening(timeout):
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "silence.wav")
+        sf.write(path, np.zeros(16000, dtype=np.float32), 16000)
+        return startup_report([sys.executable, "headless.py", "--file", path, "--speed", "0", "--quiet"], timeout)
+
+
+def print_report(label, wall_ms, report):
+    if report is None:
+        print(f"{label}: exited after {wall_ms:.0f} ms without a startup report")
+        return
+    print(f"{label}: {wall_ms:.0f} ms from launch to exit")
+    for name, ms in sorted(report["marks_ms"].items(), key=lambda item: item[1]):
+        print(f"  {name:<22} {ms:>8.0f} ms")
+    for name, ms in report["stages_ms"].items():
+        print(f"  stage {name:<16} {ms:>8.0f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--skip-paint", action="store_true", help="only measure imports")
+    args = parser.parse_args()
+
+    print(f"{'module':<24} {'import ms':>10}")
+    for module in MODULES:
+        times = [import_time_ms(module) for _ in range(args.repeats)]
+        if None in times:
+            print(f"{module:<24} {'n/a':>10}")
+        else:
+            print(f"{module:<24} {min(times):>10.0f}")
+
+    if args.skip_paint:
+        return
+
+    print()
+    print_report("headless.py until listening", *headless_listening(args.timeout))
+    print()
+    print_report("main.py until first paint", *first_paint(args.timeout))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Silero VAD throughput on CPU: windows per second for each backend.
+
+Compares the old one-call-per-window path (is_speech) with block scoring
+(speech_probs) for the torch backend, and the ONNX Runtime backend when
+assets/silero_vad.onnx and onnxruntime are available.
+
+Run from the project root:
+    python -m benchmarks.bench_vad
+"""
+import argparse
+import time
+import numpy as np
+import torch
+from audio.vad import SileroVAD
+
+WINDOW = 512
+SAMPLE_RATE = 16000
+
+
+def make_windows(seconds, block_windows):
+    rng = np.random.default_rng(0)
+    total = int(seconds * SAMPLE_RATE) // (WINDOW * block_windows) * block_windows
+    t = np.arange(total * WINDOW) / SAMPLE_RATE
+    # Bursts of voiced-like harmonics separated by low-level noise
+    envelope = (np.sin(2 * np.pi * 0.25 * t) > 0).astype(np.float32)
+    voiced = sum(np.sin(2 * np.pi * f * t) / k for k, f in enumerate((150, 300, 450, 600), start=1))
+    audio = 0.2 * envelope * voiced + 0.01 * rng.standard_normal(t.size)
+    return audio.astype(np.float32).reshape(-1, WINDOW)
+
+
+def bench(label, vad, windows, block_windows, per_window):
+    vad.reset_states()
+    start = time.perf_counter()
+    if per_window:
+        for window in windows:
+            vad.is_speech(window, SAMPLE_RATE)
+    else:
+        for i in range(0, len(windows), block_windows):
+            vad.speech_probs(windows[i:i + block_windows], SAMPLE_RATE)
+    elapsed = time.perf_counter() - start
+    rate = len(windows) / elapsed
+    realtime = rate * WINDOW / SAMPLE_RATE
+    print(f"{label:<28} {rate:>10.0f} windows/s  {realtime:>7.1f}x real time")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--seconds", type=float, default=60.0)
+    parser.add_argument("--block-windows", type=int, default=2,
+                        help="windows per call (a 1024-sample block at 16kHz gives 2)")
+    parser.add_argument("--torch-threads", type=int, default=1)
+    args = parser.parse_args()
+
+    torch.set_num_threads(args.torch_threads)
+    windows = make_windows(args.seconds, args.block_windows)
+    print(f"{len(windows)} windows, {args.block_windows} per block, torch threads={args.torch_threads}")
+
+    vad = SileroVAD(backend="torch")
+    vad.device = torch.device("cpu")
+    vad.model.to(vad.device)
+    bench("torch, per window", vad, windows, args.block_windows, per_window=True)
+    bench("torch, per block", vad, windows, args.block_windows, per_window=False)
+
+    onnx_vad = SileroVAD(backend="onnx")
+    if onnx_vad.backend == "onnx":
+        bench("onnx, per window", onnx_vad, windows, args.block_windows, per_window=True)
+        bench("onnx, per block", onnx_vad, windows, args.block_windows, per_window=False)
+    else:
+        print("onnx backend unavailable, skipped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Real-time factor and peak memory of the local transcription engines.
+
+Each engine runs in its own subprocess so its peak RSS is measured alone.
+RTF is transcription time divided by audio duration (below 1.0 is faster
+than real time). Engines with transcribe_batch also get a backlog test:
+short segments cut from the first file, transcribed one by one and then
+in batches of --batch-size.
+
+Run from the project root:
+    python -m benchmarks.bench_whisper_engines meeting1.wav meeting2.flac
+    python -m benchmarks.bench_whisper_engines --engines local faster --model-size base clip.wav
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import numpy as np
+import soundfile as sf
+from scipy import signal
+from utils.config_manager import config_manager
+
+TARGET_RATE = 16000
+ENGINES = ("local", "faster")
+
+
+def load_audio(path):
+    audio, rate = sf.read(path, dtype="float32", always_2d=True)
+    audio = audio.mean(axis=1)
+    if rate != TARGET_RATE:
+        audio = signal.resample_poly(audio, TARGET_RATE, rate).astype(np.float32)
+    return audio
+
+
+def peak_rss_mb():
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is KiB on Linux, bytes on macOS
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        import psutil
+        return psutil.Process().memory_info().peak_wset / (1024 * 1024)
+
+
+def build_engine(name):
+    if name == "local":
+        from audio.whisper_local import WhisperLocal
+        return WhisperLocal()
+    from audio.whisper_faster import WhisperFaster
+    return WhisperFaster()
+
+
+def backlog(engine, audio, batch_size, segment_seconds=3.0, count=8):
+    """Seconds to clear a backlog of short segments one by one and in batches."""
+    n = int(segment_seconds * TARGET_RATE)
+    segments = [audio[i * n:(i + 1) * n] for i in range(min(count, len(audio) // n))]
+    if len(segments) < 2:
+        return None
+    start = time.perf_counter()
+    for segment in segments:
+        engine.transcribe(segment)
+    sequential = time.perf_counter() - start
+    start = time.perf_counter()
+    for i in range(0, len(segments), batch_size):
+        engine.transcribe_batch(segments[i:i + batch_size])
+    batched = time.perf_counter() - start
+    return {"segments": len(segments), "sequential_seconds": sequential, "batched_seconds": batched}
+
+
+def run_worker(engine_name, files, batch_size=4):
+    """
+    Runs inside the subprocess: load one engine, transcribe every file, print JSON.
+    Prints {"engine", "error"} and exits non-zero if the model failed to load.
+    """
+    start = time.perf_counter()
+    engine = build_engine(engine_name)
+    load_time = time.perf_counter() - start
+    if engine.model is None:
+        # The engines log load errors and return "" for every file, which would time as a fast run
+        print(json.dumps({"engine": engine_name, "error": "model failed to load, see logs/app.log"}))
+        sys.exit(1)
+
+    results = []
+    for path in files:
+        audio = load_audio(path)
+        start = time.perf_counter()
+        text = engine.transcribe(audio)
+        elapsed = time.perf_counter() - start
+        results.append({
+            "file": path,
+            "audio_seconds": len(audio) / TARGET_RATE,
+            "seconds": elapsed,
+            "rtf": elapsed / (len(audio) / TARGET_RATE),
+            "text": text,
+        })
+    report = {"engine": engine_name, "load_seconds": load_time, "peak_rss_mb": peak_rss_mb(), "files": results}
+    if hasattr(engine, "transcribe_batch") and files:
+        report["backlog"] = backlog(engine, load_audio(files[0]), batch_size)
+    print(json.dumps(report))
+
+
+def worker_report(proc):
+    """The JSON a worker subprocess printed, or {"error": ...} if it failed."""
+    lines = [line for line in proc.stdout.splitlines() if line.startswith("{")]
+    report = json.loads(lines[-1]) if lines else {}
+    if proc.returncode != 0 and "error" not in report:
+        report = {"error": (proc.stderr.strip().splitlines() or [f"exit code {proc.returncode}"])[-1]}
+    elif not lines:
+        report = {"error": "no output"}
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="+", help="WAV/FLAC recordings")
+    parser.add_argument("--engines", nargs="+", choices=ENGINES, default=list(ENGINES))
+    parser.add_argument("--model-size", help="override whisper_model_size from config.json")
+    parser.add_argument("--batch-size", type=int, default=4, help="segments per batch in the backlog test")
+    parser.add_argument("--worker", choices=ENGINES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.model_size:
+        # In-memory only, config.json is left untouched
+        config_manager.config["whisper_model_size"] = args.model_size
+
+    if args.worker:
+        run_worker(args.worker, args.files, args.batch_size)
+        return
+
+    print(f"{'engine':<8} {'load s':>7} {'peak MB':>8} {'audio s':>8} {'RTF':>6}  file")
+    for engine in args.engines:
+        cmd = [sys.executable, "-m", "benchmarks.bench_whisper_engines", "--worker", engine,
+               "--batch-size", str(args.batch_size)] + args.files
+        if args.model_size:
+            cmd += ["--model-size", args.model_size]
+        proc = subprocess.run(cmd, capture_output=True, text=True, cwd=os.getcwd())
+        report = worker_report(proc)
+        if "error" in report:
+            print(f"{engine:<8} failed: {report['error']}")
+            continue
+        for item in report["files"]:
+            print(f"{engine:<8} {report['load_seconds']:>7.1f} {report['peak_rss_mb']:>8.0f} "
+                  f"{item['audio_seconds']:>8.1f} {item['rtf']:>6.2f}  {os.path.basename(item['file'])}")
+        if report.get("backlog"):
+            b = report["backlog"]
+            print(f"{engine:<8} backlog of {b['segments']} segments: {b['sequential_seconds']:.1f}s one by one, "
+                  f"{b['batched_seconds']:.1f}s in batches of {args.batch_size}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Local stand-in for the OpenAI API, for exercising the cloud code paths offline.
+
+Answers POST /v1/audio/transcriptions with {"text": ...} after a fixed
+delay and can fail a fraction of requests with 503 to exercise retries.
+Chat completions requested with "stream": true are sent as server-sent
+events: the first token after the delay, then one every token_delay.
+connect_delay holds up the first response on each new connection, standing
+in for the DNS, TCP and TLS setup of a real one; HEAD requests are answered
+right away (after that) and used to warm connections up.
+Point openai_base_url at it (http://127.0.0.1:<port>/v1).
+
+Run from the project root:
+    python -m benchmarks.cloud_stub_server --port 8765 --delay 0.4 --fail-rate 0.2
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1" # keep-alive, like the real API
+    disable_nagle_algorithm = True # headers and body go out in separate writes
+
+    def log_message(self, format, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        # Once per connection
+        time.sleep(self.server.connect_delay)
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_stream(self, tokens, token_delay):
+        # Server-sent events in chunked encoding, as the real API streams
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        events = [{"choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]} for token in tokens]
+        events.append({"choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+        try:
+            for i, event in enumerate(events):
+                if i:
+                    time.sleep(token_delay)
+                event.update({"id": "stub", "object": "chat.completion.chunk", "created": 0, "model": "stub"})
+                data = f"data: {json.dumps(event)}\n\n".encode()
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+            done = b"data: [DONE]\n\n"
+            self.wfile.write(f"{len(done):x}\r\n".encode() + done + b"\r\n0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True # the client cancelled the stream
+
+    def do_POST(self):
+        server = self.server
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        with server.lock:
+            server.requests += 1
+            server.active += 1
+            server.max_active = max(server.max_active, server.active)
+            server.connections.add(self.client_address)
+        try:
+            time.sleep(server.delay)
+            if random.random() < server.fail_rate:
+                with server.lock:
+                    server.failures += 1
+                self._send_json(503, {"error": {"message": "stub overloaded", "type": "server_error"}})
+                return
+            if self.path.endswith("/audio/transcriptions"):
+                self._send_json(200, {"text": f"stub transcript of {len(body)} bytes"})
+            elif json.loads(body or b"{}").get("stream"):
+                self._send_stream([f"token{i} " for i in range(server.stream_tokens)], server.token_delay)
+            else:
+                self._send_json(200, {"choices": [{"index": 0, "message": {"role": "assistant",
+                                                                           "content": "stub reply"}}]})
+        finally:
+            with server.lock:
+                server.active -= 1
+
+
+class CloudStubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port=0, delay=0.3, fail_rate=0.0, token_delay=0.02, stream_tokens=20, connect_delay=0.0):
+        super().__init__(("127.0.0.1", port), StubHandler)
+        self.delay = delay
+        self.connect_delay = connect_delay
+        self.fail_rate = fail_rate
+        self.token_delay = token_delay
+        self.stream_tokens = stream_tokens
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.failures = 0
+        self.active = 0
+        self.max_active = 0
+        self.connections = set()
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/v1"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def stats(self):
+        with self.lock:
+            return {
+                "requests": self.requests,
+                "failures": self.failures,
+                "max_concurrent": self.max_active,
+                "connections": len(self.connections),
+            }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--delay", type=float, default=0.3, help="seconds per request")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="seconds between streamed tokens")
+    parser.add_argument("--connect-delay", type=float, default=0.0, help="seconds of setup per new connection")
+    args = parser.parse_args()
+
+    server = CloudStubServer(args.port, args.delay, args.fail_rate, args.token_delay,
+                             connect_delay=args.connect_delay)
+    print(f"Serving stub OpenAI API at {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Writes benchmarks/fixtures/synthetic_meeting_48k.flac, the bundled fixture.
+
+A stand-in for a recorded meeting until real recordings are added next to
+it: two voices from benchmarks/signals.py taking turns at different
+levels, through a small room's reverb, over mains hum and a noise floor,
+at 48 kHz like a loopback capture. The seed is fixed, so the file can be
+regenerated bit for bit; run_all and bench_energy_gate pick it up with
+any other WAV/FLAC in the directory.
+
+Run from the project root:
+    python -m benchmarks.make_fixtures
+"""
+import argparse
+import os
+import numpy as np
+import soundfile as sf
+from scipy import signal
+from benchmarks.run_all import FIXTURES_DIR
+from benchmarks.signals import speech_like, resample_to
+
+RATE = 48000
+
+
+def utterances(seed, level):
+    # 16 kHz speech of one voice, cut into its utterances
+    audio, intervals = speech_like(60.0, 16000, seed=seed, utterance=(1.5, 3.5), level=level, noise=0.0)
+    return [audio[int(start * 16000):int(end * 16000)] for start, end in intervals]
+
+
+def synthetic_meeting(turns=4, seed=7):
+    """Returns (float32 mono audio at RATE, [(start_s, end_s, speaker), ...])."""
+    rng = np.random.default_rng(seed)
+    # A near talker and a quieter, farther one
+    voices = {"A": utterances(seed, 0.3), "B": utterances(seed + 1, 0.2)}
+    parts = [np.zeros(int(rng.uniform(0.8, 1.2) * 16000))]
+    intervals = []
+    pos = len(parts[0])
+    for turn in range(turns):
+        speaker = "AB"[turn % 2]
+        speech = voices[speaker][turn // 2]
+        parts.append(speech)
+        intervals.append((pos / 16000, (pos + len(speech)) / 16000, speaker))
+        gap = np.zeros(int(rng.uniform(0.5, 1.5) * 16000))
+        parts.append(gap)
+        pos += len(speech) + len(gap)
+    audio = resample_to(np.concatenate(parts).astype(np.float32), 16000, RATE).astype(np.float64)
+
+    t = np.arange(len(audio)) / RATE
+    # Room: a direct path and an exponentially decaying diffuse tail (about 0.15 s RT60)
+    ir = rng.standard_normal(int(0.25 * RATE)) * np.exp(-np.arange(int(0.25 * RATE)) / (0.05 * RATE))
+    ir[0] = 8.0
+    audio = signal.fftconvolve(audio, ir / (np.abs(ir).sum() / 4))[:len(audio)]
+    audio += 0.003 * np.sin(2 * np.pi * 50 * t) + 0.0015 * np.sin(2 * np.pi * 150 * t)
+    audio += 0.005 * signal.lfilter([0.05], [1, -0.95], rng.standard_normal(len(audio)))
+    audio *= 0.5 / np.abs(audio).max()
+    return audio.astype(np.float32), intervals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default=os.path.join(FIXTURES_DIR, "synthetic_meeting_48k.flac"))
+    args = parser.parse_args()
+
+    audio, intervals = synthetic_meeting()
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    sf.write(args.output, audio, RATE, subtype="PCM_16")
+    print(f"Wrote {args.output}: {len(audio) / RATE:.1f}s, {len(intervals)} turns")
+    for start, end, speaker in intervals:
+        print(f"  {speaker} {start:6.2f} - {end:6.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,570 @@
+"""
+Offline benchmark suite for the capture -> VAD -> segmentation -> ASR path.
+
+Cases:
+  resample      StreamingResampler CPU ms per second of audio
+  vad           Silero windows per second for each available backend, on
+                generated audio and the fixtures (with the share called speech)
+  segmentation  AudioListener fed from a file as fast as possible: speed,
+                segment count and boundary error on generated speech (with an
+                oracle VAD), and speed and segment count on recorded fixtures
+                (with Silero)
+  energy_gate   VAD CPU seconds and skipped windows with the energy gate, against
+                the ungated run, on generated meeting audio and the fixtures
+  engines       real-time factor of the local Whisper engines, and backlog
+                clearing one by one vs batched where the engine batches
+  cloud         WhisperCloud throughput against the local stub server
+  llm           Translator round-trip latency against the local stub server,
+                time to first token / whole reply when streaming, the
+                response cache: hit latency and hit ratio, and the request
+                scheduler: requests sent for a double press and queue wait,
+                and the first request on a cold vs a warmed-up connection
+  history       request size over a long meeting with the token-budgeted
+                history, against sending the whole chat
+
+Generated signals come from benchmarks/signals.py with fixed seeds;
+recordings are any WAV/FLAC files in benchmarks/fixtures/ (or --fixtures).
+The bundled synthetic_meeting_48k.flac is written by make_fixtures.py.
+Nothing leaves the machine. Results are written as JSON, and --compare
+flags metrics that got worse than a previous run by more than --threshold.
+The exit code is non-zero if a case failed or a metric regressed.
+
+Run from the project root:
+    python -m benchmarks.run_all --output before.json
+    python -m benchmarks.run_all --only resample vad segmentation --compare before.json
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import numpy as np
+import soundfile as sf
+from benchmarks.signals import speech_like, resample_to
+from utils.config_manager import config_manager
+from utils.tracing import tracer
+
+SAMPLE_RATE = 16000
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+# Metric name endings and whether a larger value is better; other metrics
+# (counts, flags) are reported as changed whenever they differ
+HIGHER_IS_BETTER = ("per_second", "x_realtime")
+LOWER_IS_BETTER = ("_ms", "_us", "_seconds", "rtf", "_mb")
+
+
+class OracleVAD:
+    """Stands in for Silero on generated audio, whose speech intervals are known exactly."""
+    threshold = 0.5
+
+    def __init__(self, intervals, window=512):
+        self.intervals = intervals
+        self.window = window
+        self.pos = 0
+
+    def reset_states(self):
+        self.pos = 0
+
+    def speech_probs(self, windows, sample_rate=16000):
+        starts = (self.pos + np.arange(len(windows)) * self.window) / sample_rate
+        self.pos += len(windows) * self.window
+        probs = np.zeros(len(windows), dtype=np.float32)
+        for start, end in self.intervals:
+            probs[(starts + self.window / sample_rate > start) & (starts < end)] = 1.0
+        return probs
+
+
+class StubEngine:
+    """Answers instantly with the segment length, so segmentation is measured alone."""
+
+    def transcribe(self, audio_data, sample_rate=16000):
+        return f"{len(audio_data) / sample_rate:.3f}"
+
+
+def use_stub_engine():
+    from audio.engine_registry import register_engine
+    register_engine("bench", "Benchmark stub", StubEngine)
+    config_manager.config["transcription_mode"] = "bench"
+
+
+def write_temp_audio(audio, sample_rate, directory):
+    path = os.path.join(directory, f"signal_{sample_rate}.flac")
+    sf.write(path, audio, sample_rate)
+    return path
+
+
+def run_listener(path, vad):
+    """Replay a file through AudioListener at full speed. Returns (seconds, [segment lengths])."""
+    from audio.audio_listener import AudioListener
+    from audio.sources import FileSource
+
+    lengths = []
+    finished = threading.Event()
+    listener = AudioListener(lambda text, trace_id=None, source="": lengths.append(float(text)),
+                             on_finished_callback=finished.set)
+    listener.vad = vad
+    listener.preload()
+    listener.models_ready.wait()
+    source = FileSource(path, speed=0)
+    start = time.perf_counter()
+    listener.start(source)
+    finished.wait()
+    return time.perf_counter() - start, lengths
+
+
+# ---- cases ----
+
+def bench_resample(args, workdir):
+    from benchmarks.bench_resampler import make_audio, run_streaming, cpu_per_audio_second
+    results = {}
+    for rate in (44100, 48000):
+        audio = make_audio(rate, args.seconds)
+        results[str(rate)] = {"cpu_ms": cpu_per_audio_second(run_streaming, audio, rate, 3) * 1000}
+    return results
+
+
+def bench_vad(args, workdir):
+    import torch
+    from audio.vad import SileroVAD
+    from benchmarks.bench_vad import make_windows
+
+    from benchmarks.bench_whisper_engines import load_audio
+
+    torch.set_num_threads(1)
+    signals = {"synthetic": make_windows(args.seconds, 2)}
+    for fixture in fixture_paths(args):
+        audio = load_audio(fixture)
+        signals[os.path.basename(fixture)] = audio[:len(audio) // 1024 * 1024].reshape(-1, 512)
+    results = {}
+    for backend in ("torch", "onnx"):
+        vad = SileroVAD(backend=backend)
+        if vad.backend != backend:
+            results[backend] = {"skipped": "backend unavailable"}
+            continue
+        if backend == "torch":
+            vad.device = torch.device("cpu")
+            vad.model.to(vad.device)
+        for name, windows in signals.items():
+            vad.reset_states()
+            probs = []
+            start = time.perf_counter()
+            for i in range(0, len(windows), 2):
+                probs.append(vad.speech_probs(windows[i:i + 2], SAMPLE_RATE))
+            elapsed = time.perf_counter() - start
+            result = {"windows_per_second": len(windows) / elapsed}
+            if name != "synthetic":
+                # The share of a recording called speech should not move between runs
+                result["speech_windows"] = round(float(np.mean(np.concatenate(probs) > vad.threshold)), 3)
+            if name == "synthetic":
+                results[backend] = result
+            else:
+                results[backend][name] = result
+    return results
+
+
+def bench_segmentation(args, workdir):
+    use_stub_engine()
+    results = {}
+
+    # Generated speech at a typical device rate, so resampling is part of the path
+    audio, intervals = speech_like(args.seconds, SAMPLE_RATE, seed=1)
+    path = write_temp_audio(resample_to(audio, SAMPLE_RATE, 48000), 48000, workdir)
+    # The oracle keeps time by counting the windows it scores, so none may be skipped
+    config_manager.config["energy_gate"] = False
+    try:
+        elapsed, lengths = run_listener(path, OracleVAD(intervals))
+    finally:
+        config_manager.config["energy_gate"] = True
+    # Utterances closer together than the end-of-speech silence make one segment; the
+    # oracle marks every window touching speech, so a pause loses up to two windows
+    max_gap = config_manager.get("end_of_speech_ms", 672) / 1000 + 2 * 512 / SAMPLE_RATE
+    merged = []
+    for start, end in intervals:
+        if merged and start - merged[-1][1] < max_gap:
+            merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    expected = [end - start for start, end in merged]
+    result = {
+        "x_realtime": len(audio) / SAMPLE_RATE / elapsed,
+        "segments": len(lengths),
+        "expected_segments": len(expected),
+    }
+    if len(lengths) == len(expected):
+        # Segments run on past the speech by the pre-roll and trailing silence, which are part of the error
+        result["length_error_ms"] = float(np.mean(np.abs(np.array(lengths) - expected))) * 1000
+    results["synthetic"] = result
+
+    vad = None
+    for fixture in fixture_paths(args):
+        if vad is None:
+            from audio.vad import SileroVAD
+            vad = SileroVAD()
+        elapsed, lengths = run_listener(fixture, vad)
+        results[os.path.basename(fixture)] = {
+            "x_realtime": sf.info(fixture).duration / elapsed,
+            "segments": len(lengths),
+        }
+    return results
+
+
+def bench_energy_gate(args, workdir):
+    from benchmarks.bench_energy_gate import run
+    return run(args.seconds, fixture_paths(args), workdir)
+
+
+def bench_engines(args, workdir):
+    import importlib.util
+    from benchmarks.bench_whisper_engines import worker_report
+    audio, _ = speech_like(min(args.seconds, 30.0), SAMPLE_RATE, seed=2)
+    files = [write_temp_audio(audio, SAMPLE_RATE, workdir)] + fixture_paths(args)
+    packages = {"local": "whisper", "faster": "faster_whisper"}
+
+    results = {}
+    for engine, package in packages.items():
+        if importlib.util.find_spec(package) is None:
+            results[engine] = {"skipped": f"{package} not installed"}
+            continue
+        # Separate process per engine, so peak memory is its own
+        cmd = [sys.executable, "-m", "benchmarks.bench_whisper_engines", "--worker", engine] + files
+        if args.model_size:
+            cmd += ["--model-size", args.model_size]
+        proc = subprocess.run(cmd, capture_output=True, text=True, cwd=os.getcwd())
+        report = worker_report(proc)
+        if "error" in report:
+            results[engine] = {"error": report["error"]}
+            continue
+        results[engine] = {"load_seconds": report["load_seconds"], "peak_rss_mb": report["peak_rss_mb"]}
+        if report.get("backlog"):
+            results[engine]["backlog_sequential_seconds"] = report["backlog"]["sequential_seconds"]
+            results[engine]["backlog_batched_seconds"] = report["backlog"]["batched_seconds"]
+        for item in report["files"]:
+            name = "synthetic" if item["file"] == files[0] else os.path.basename(item["file"])
+            results[engine][f"{name}.rtf"] = item["rtf"]
+    return results
+
+
+def bench_cloud(args, workdir):
+    from benchmarks.bench_cloud import run
+    from benchmarks.cloud_stub_server import CloudStubServer
+
+    rng = np.random.default_rng(3)
+    segments = [(0.1 * rng.standard_normal(3 * SAMPLE_RATE)).astype(np.float32) for _ in range(12)]
+    results = {}
+    for in_flight in (1, 3):
+        server = CloudStubServer(delay=0.2).start()
+        try:
+            result = run(server, segments, in_flight)
+        finally:
+            server.stop()
+        results[f"in_flight_{in_flight}"] = {
+            "segments_per_second": result["segments_per_second"],
+            "in_order": result["in_order"],
+            "errors": result["errors"],
+        }
+    return results
+
+
+def bench_llm(args, workdir):
+    from benchmarks.cloud_stub_server import CloudStubServer
+    from llm.response_cache import ResponseCache
+    from llm.scheduler import LLMScheduler
+    from llm.translator import Translator
+
+    server = CloudStubServer(delay=0.05).start()
+    try:
+        config_manager.config.update({"openai_api_key": "stub", "openai_base_url": server.base_url})
+        translator = Translator()
+        translator.get_client() # import and client construction are not part of the request
+        latencies = []
+        for i in range(20):
+            start = time.perf_counter()
+            translator.process_with_history([{"role": "user", "content": f"sentence {i}"}])
+            latencies.append((time.perf_counter() - start) * 1000)
+
+        # Streamed replies: time to the first token and to the whole reply
+        first_tokens, totals = [], []
+        for i in range(10):
+            arrivals = []
+            start = time.perf_counter()
+            translator.process_with_history([{"role": "user", "content": f"sentence {i}"}],
+                                            on_delta=lambda text: arrivals.append(time.perf_counter()))
+            totals.append((time.perf_counter() - start) * 1000)
+            first_tokens.append((arrivals[0] - start) * 1000)
+
+        # Response cache: recurring phrases, each sent a few times after a growing chat
+        # history as in a meeting, in a cache kept in workdir
+        config_manager.config["llm_cache_enabled"] = True
+        path = os.path.join(workdir, "llm_responses.json")
+        translator.cache = ResponseCache(path)
+        history, hits = [], []
+        for i in range(20):
+            messages = history + [{"role": "user", "content": f"phrase {i % 5}"}]
+            start = time.perf_counter()
+            reply = translator.process_with_history(messages)
+            hits.append((time.perf_counter() - start) * 1e6)
+            history = messages + [{"role": "assistant", "content": reply}]
+        cache = translator.cache.stats()
+        # The new replies are written once, in the background; a restarted app finds them on disk
+        translator.cache.flush()
+        writes = translator.cache.stats()["saves"]
+        translator.cache = ResponseCache(path)
+        translator.process_with_history([{"role": "user", "content": "phrase 0"}])
+        persisted = translator.cache.stats()["hits"]
+        config_manager.config["llm_cache_enabled"] = False
+
+        # Scheduler: ten double presses, 100 ms apart
+        before = server.stats()["requests"]
+        scheduler = LLMScheduler(lambda text, trace_id, cancel: translator.process_with_history(
+            [{"role": "user", "content": text}], on_delta=lambda delta: None, cancel=cancel))
+        for i in range(10):
+            scheduler.submit(f"press {i}")
+            time.sleep(0.1)
+            scheduler.submit(f"press {i} again")
+            scheduler.wait_idle()
+        presses = scheduler.stats()
+        press_requests = server.stats()["requests"] - before
+    finally:
+        config_manager.config["llm_cache_enabled"] = False
+        server.stop()
+    # The first request pays for the connection, the rest reuse it
+    return {
+        "stub": {
+            "first_request_ms": latencies[0],
+            "p50_ms": float(np.percentile(latencies[1:], 50)),
+            "p95_ms": float(np.percentile(latencies[1:], 95)),
+            "stub_delay_ms": server.delay * 1000,
+        },
+        "stub_streaming": {
+            "first_token_p50_ms": float(np.percentile(first_tokens, 50)),
+            "total_p50_ms": float(np.percentile(totals, 50)),
+            "stub_tokens": server.stream_tokens,
+        },
+        "stub_cache": {
+            "hit_p50_us": float(np.percentile(hits[5:], 50)),
+            "hit_ratio": cache["hit_ratio"],
+            "hits_after_restart": persisted,
+            "file_writes": writes,
+        },
+        "stub_scheduler": {
+            "requests_per_double_press": press_requests / 10,
+            "queue_wait_ms": presses["avg_wait"] * 1000,
+            "coalesce_window_ms": scheduler.coalesce_window * 1000,
+        },
+        "stub_connect": bench_first_request(translator),
+    }
+
+
+def bench_first_request(translator, connect_delay=0.1, rounds=5):
+    """First request on a new connection pool, without and with a warm-up in the background."""
+    from benchmarks.cloud_stub_server import CloudStubServer
+    from utils.openai_client import openai_clients
+
+    server = CloudStubServer(delay=0.05, connect_delay=connect_delay).start()
+    cold, warm = [], []
+    try:
+        config_manager.config["openai_base_url"] = server.base_url
+        for _ in range(rounds):
+            for results in (cold, warm):
+                openai_clients.close() # drops the pooled connections
+                if results is warm:
+                    openai_clients.warm().join() # at startup this overlaps with model loading
+                start = time.perf_counter()
+                translator.process_with_history([{"role": "user", "content": "hello"}])
+                results.append((time.perf_counter() - start) * 1000)
+    finally:
+        server.stop()
+        openai_clients.close()
+    return {
+        "cold_first_request_ms": float(np.median(cold)),
+        "warm_first_request_ms": float(np.median(warm)),
+        "connect_delay_ms": connect_delay * 1000,
+    }
+
+
+def bench_history(args, workdir):
+    from benchmarks.cloud_stub_server import CloudStubServer
+    from llm.history_manager import HistoryManager, message_tokens
+    from llm.translator import Translator
+
+    rng = np.random.default_rng(5)
+    words = ["budget", "deadline", "release", "customer", "review", "design", "migration", "latency",
+             "we", "should", "the", "next", "sprint", "because", "team", "agreed", "on", "Friday"]
+    server = CloudStubServer(delay=0.0, token_delay=0.0).start()
+    try:
+        config_manager.config.update({"openai_api_key": "stub", "openai_base_url": server.base_url})
+        translator = Translator()
+        history = HistoryManager(translator)
+        full = 0 # what sending the whole chat would cost
+        sizes = []
+        # Two hours of meeting with a request every minute
+        for i in range(120):
+            prompt = " ".join(rng.choice(words, 150))
+            history.add("user", prompt)
+            sizes.append(history.tokens())
+            reply = translator.process_with_history(history.messages())
+            history.add("assistant", reply)
+            full += message_tokens({"content": prompt}) + message_tokens({"content": reply})
+            history.compact()
+    finally:
+        server.stop()
+    return {"stub": {
+        "prompt_tokens_max": max(sizes),
+        "prompt_tokens_last": sizes[-1],
+        "unbounded_prompt_tokens_last": full,
+        "folds": history.folds,
+    }}
+
+
+CASES = {
+    "resample": bench_resample,
+    "vad": bench_vad,
+    "segmentation": bench_segmentation,
+    "energy_gate": bench_energy_gate,
+    "engines": bench_engines,
+    "cloud": bench_cloud,
+    "llm": bench_llm,
+    "history": bench_history,
+}
+
+
+def fixture_paths(args):
+    if args.fixtures:
+        return args.fixtures
+    return sorted(glob.glob(os.path.join(FIXTURES_DIR, "*.wav")) + glob.glob(os.path.join(FIXTURES_DIR, "*.flac")))
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+# ---- comparison ----
+
+def flatten(results, prefix=""):
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + "."))
+        else:
+            flat[name] = value
+    return flat
+
+
+def failures(results, prefix=""):
+    """Names of the cases (and engines/backends within them) that reported an error."""
+    failed = []
+    for key, value in results.items():
+        if isinstance(value, dict):
+            if "error" in value:
+                failed.append(f"{prefix}{key}")
+            else:
+                failed += failures(value, f"{prefix}{key}.")
+    return failed
+
+
+def compare(baseline, current, threshold):
+    """Print metric changes against a baseline run. Returns the number of regressions."""
+    old = flatten(baseline["results"])
+    new = flatten(current["results"])
+    regressions = 0
+    print(f"\nCompared with {baseline['meta'].get('commit') or 'baseline'} "
+          f"({baseline['meta'].get('date', '?')}), threshold {threshold:.0%}:")
+    for name in sorted(set(old) & set(new)):
+        a, b = old[name], new[name]
+        if isinstance(a, (int, float)) and isinstance(b, (int, float)) and not isinstance(a, bool):
+            leaf = name.rsplit(".", 1)[-1]
+            if leaf.endswith(HIGHER_IS_BETTER):
+                change = (b - a) / a if a else 0.0
+            elif leaf.endswith(LOWER_IS_BETTER):
+                change = (a - b) / a if a else 0.0
+            elif a != b:
+                change = None # counts should not move at all
+            else:
+                continue
+            if change is None or change < -threshold:
+                regressions += 1
+                flag = "REGRESSION"
+            elif change > threshold:
+                flag = "improved"
+            else:
+                continue
+            print(f"  {flag:<10} {name}: {a:.4g} -> {b:.4g}")
+        elif a != b:
+            regressions += 1
+            print(f"  {'REGRESSION':<10} {name}: {a} -> {b}")
+    ran = set(current["results"])
+    for name in sorted(n for n in set(old) - set(new) if n.split(".", 1)[0] in ran):
+        print(f"  {'missing':<10} {name}")
+    if not regressions:
+        print("  no regressions")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", nargs="+", choices=list(CASES), help="run only these cases")
+    parser.add_argument("--seconds", type=float, default=60.0, help="length of generated signals")
+    parser.add_argument("--fixtures", nargs="+", help="recordings to use instead of benchmarks/fixtures/")
+    parser.add_argument("--model-size", default="tiny", help="whisper model size for the engines case")
+    parser.add_argument("--output", help="result file (default benchmarks/results/<time>.json)")
+    parser.add_argument("--compare", help="earlier result file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative change treated as a regression")
+    args = parser.parse_args()
+
+    # Benchmark runs must not add to the app's latency traces or config.json, or use its LLM cache
+    tracer.enabled = False
+    config_manager.save_config = lambda: None
+    config_manager.config["llm_cache_enabled"] = False
+
+    report = {
+        "meta": {
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "processor": platform.processor() or platform.machine(),
+            "seconds": args.seconds,
+        },
+        "results": {},
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        for name in args.only or CASES:
+            print(f"Running {name}...", flush=True)
+            start = time.perf_counter()
+            try:
+                report["results"][name] = CASES[name](args, workdir)
+            except Exception as e:
+                report["results"][name] = {"error": f"{type(e).__name__}: {e}"}
+            print(f"  {json.dumps(report['results'][name])} ({time.perf_counter() - start:.1f}s)")
+
+    output = args.output or os.path.join(RESULTS_DIR, time.strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+    failed = failures(report["results"])
+    if failed:
+        print(f"Failed: {', '.join(failed)}")
+    regressions = 0
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, report, args.threshold)
+    if failed or regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""
+Headless Meeting Assistant: transcription (and optional AI responses) without Qt.
+
+Reads from the configured input device or from a WAV/FLAC file and writes one
+JSON object per line:
+    {"type": "transcript", "time": ..., "text": ..., "source": ...}
+    {"type": "ai", "time": ..., "text": ...}
+    {"type": "status" | "error", "time": ..., "text": ...}
+    {"type": "error", "time": ..., "text": "Transcription Error: ...", "source": ...}
+    {"type": "status", "time": ..., "text": "Pipeline stats", "stats": {...}}
+Logs go to stderr (and logs/app.log) so stdout stays clean JSONL.
+
+Examples:
+    python headless.py --file meeting.flac --speed 0 --output meeting.jsonl
+    python headless.py --device 3 --ai-interval 60
+"""
+import os
+# Before any project import: the logger's console handler is built on import (and
+# config_manager may warn on import), and stdout is reserved for JSONL
+os.environ.setdefault("MEETING_ASSISTANT_LOG_STREAM", "stderr")
+from utils.startup import startup, BENCH_EXIT_AFTER_PAINT # first, so startup timings begin here
+import argparse
+import json
+import logging
+import sys
+import threading
+import time
+from utils.logger import logger
+from utils.config_manager import config_manager
+from utils.tracing import tracer
+from audio.audio_listener import AudioListener
+
+
+class JsonlWriter:
+    def __init__(self, stream):
+        self.stream = stream
+        self.lock = threading.Lock()
+
+    def write(self, kind, text, **fields):
+        record = {"type": kind, "time": round(time.time(), 3), "text": text, **fields}
+        with self.lock:
+            self.stream.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self.stream.flush()
+
+
+class HeadlessApp:
+    def __init__(self, writer, ai_interval=0):
+        self.writer = writer
+        self.ai_interval = ai_interval
+        self.finished = threading.Event()
+
+        # Same bookkeeping as MainApp: new transcript since the last AI request, and the chat so far
+        self.accumulated_transcript = []
+        self.history = None
+        self.transcript_lock = threading.Lock()
+        self.translator = None
+        self.llm_scheduler = None
+        if ai_interval > 0:
+            from llm.translator import Translator
+            from llm.history_manager import HistoryManager
+            from llm.scheduler import LLMScheduler
+            self.translator = Translator()
+            self.history = HistoryManager(self.translator)
+            # One request at a time, so responses come out in order and share one history
+            self.llm_scheduler = LLMScheduler(self._process_llm, coalesce_window=0)
+
+        self.audio_listener = AudioListener(
+            on_transcript_callback=self.on_transcript_received,
+            on_error_callback=lambda msg: self.writer.write("error", msg),
+            on_status_callback=lambda msg: self.writer.write("status", msg),
+            on_finished_callback=self.finished.set
+        )
+
+    def on_transcript_received(self, text, trace_id=None, source=""):
+        tracer.mark(trace_id, "callback")
+        if text.startswith("Error: "):
+            # WhisperCloud reports failures as the segment's text; keep them out of the transcript and the LLM
+            tracer.discard(trace_id)
+            self.writer.write("error", f"Transcription {text}", **({"source": source} if source else {}))
+            return
+        with self.transcript_lock:
+            # Speaker tags tell the LLM who said what when several inputs are captured
+            self.accumulated_transcript.append(f"{source}: {text}" if source else text)
+        if source:
+            self.writer.write("transcript", text, source=source)
+        else:
+            self.writer.write("transcript", text)
+        tracer.finish(trace_id, "render")
+
+    def send_to_ai(self):
+        with self.transcript_lock:
+            if not self.accumulated_transcript:
+                return
+            new_text = " ".join(self.accumulated_transcript)
+            self.accumulated_transcript = []
+        self.llm_scheduler.submit(new_text, tracer.begin("llm", "request"))
+
+    def _process_llm(self, new_text, trace_id, cancel):
+        try:
+            prompt = self.translator.prompt_manager.get_prompt(new_text)
+            self.history.add("user", prompt)
+            tracer.mark(trace_id, "llm_start")
+            # Output is one line per reply, streaming only times the first token
+            tokens = []
+
+            def on_delta(text):
+                if not tokens:
+                    tracer.mark(trace_id, "first_token")
+                tokens.append(text)
+
+            response = self.translator.process_with_history(self.history.messages(), on_delta=on_delta)
+            tracer.mark(trace_id, "llm_end")
+            self.history.add("assistant", response)
+            self.writer.write("ai", response)
+            tracer.finish(trace_id, "render")
+            self.history.compact()
+        except Exception as e:
+            tracer.discard(trace_id)
+            logger.error(f"LLM processing failed: {e}")
+            self.writer.write("error", f"AI Error: {e}")
+
+    def run(self, source=None):
+        self.audio_listener.start(source)
+        if not self.audio_listener.running:
+            return 1
+        startup.mark("listening")
+        self.writer.write("status", "Listening started...", startup_ms=round(startup.elapsed_ms()))
+        if BENCH_EXIT_AFTER_PAINT:
+            # No window to paint: report once capture is running
+            startup.dump_report()
+            self.audio_listener.stop()
+            return 0
+
+        if self.translator or config_manager.get("transcription_mode") == "cloud":
+            from utils.openai_client import openai_clients
+            openai_clients.warm() # the first request skips DNS, TCP and TLS setup
+
+        next_ai = time.monotonic() + self.ai_interval
+        stats_interval = config_manager.get("stats_log_seconds", 60)
+        next_stats = time.monotonic() + stats_interval
+        try:
+            while not self.finished.wait(0.5):
+                if self.translator and time.monotonic() >= next_ai:
+                    self.send_to_ai()
+                    next_ai = time.monotonic() + self.ai_interval
+                if time.monotonic() >= next_stats:
+                    self.write_stats()
+                    next_stats = time.monotonic() + stats_interval
+        except KeyboardInterrupt:
+            self.writer.write("status", "Interrupted, finishing queued transcriptions...")
+            self.audio_listener.stop()
+            self.audio_listener.transcription_pool.wait_idle()
+
+        if self.translator:
+            self.send_to_ai()
+            self.llm_scheduler.wait_idle()
+            self.translator.cache.flush()
+        self.write_stats()
+        self.writer.write("status", "Listening stopped.")
+        return 0
+
+    def write_stats(self):
+        # Backlog, waits, capture losses and energy gate counts, as a status record
+        stats = self.audio_listener.log_stats()
+        if stats:
+            self.writer.write("status", "Pipeline stats", stats=stats)
+
+
+def quiet_console(quiet):
+    # The console handler is on stderr already (see the top of the file); --quiet keeps it to warnings
+    for handler in logger.handlers:
+        if quiet and type(handler) is logging.StreamHandler:
+            handler.setLevel(logging.WARNING)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--file", help="transcribe this WAV/FLAC file instead of a live device")
+    parser.add_argument("--speed", type=float, help="file replay speed: 1 real time, N faster, 0 as fast as possible")
+    parser.add_argument("--device", type=int, help="input device index (default: audio_device_index)")
+    parser.add_argument("--mode", help="transcription_mode override (local, faster, cloud)")
+    parser.add_argument("--output", help="JSONL output file (default: stdout)")
+    parser.add_argument("--ai-interval", type=float, default=0,
+                        help="send new transcript to the LLM every N seconds and at the end (0: off)")
+    parser.add_argument("--quiet", action="store_true", help="only warnings and errors on stderr")
+    args = parser.parse_args()
+
+    quiet_console(args.quiet)
+    # Command line choices apply to this run only, config.json is not rewritten
+    if args.mode:
+        config_manager.config["transcription_mode"] = args.mode
+
+    source = None
+    if args.file:
+        from audio.sources import FileSource
+        speed = args.speed if args.speed is not None else config_manager.get("replay_speed", 1.0)
+        source = FileSource(args.file, speed=speed)
+    elif args.device is not None:
+        from audio.sources import DeviceSource
+        source = DeviceSource(args.device)
+
+    stream = open(args.output, "a", encoding="utf-8") if args.output else sys.stdout
+    try:
+        app = HeadlessApp(JsonlWriter(stream), args.ai_interval)
+        return app.run(source)
+    finally:
+        if args.output:
+            stream.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
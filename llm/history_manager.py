@@ -0,0 +1,144 @@
+import threading
+from utils.logger import logger
+from utils.config_manager import config_manager
+from llm.translator import SYSTEM_PROMPT
+
+# Per-message framing the chat format adds on top of the content
+MESSAGE_OVERHEAD_TOKENS = 4
+
+_encoding = None
+
+
+def count_tokens(text):
+    """Tokens in text, with tiktoken when it is installed, else about 4 characters per token."""
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken # Optional: exact counts for OpenAI models
+            _encoding = tiktoken.get_encoding("o200k_base")
+        except Exception:
+            _encoding = False
+    if _encoding:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+
+def message_tokens(message):
+    return count_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+
+
+class HistoryManager:
+    """
+    Chat history for the LLM, kept within a token budget.
+
+    The most recent turns are sent verbatim; once they outgrow
+    llm_history_tokens, the oldest are folded into a running summary (one
+    LLM call per fold, off the request path) that is sent in the system
+    message. Request size stays flat however long the meeting runs.
+    """
+
+    def __init__(self, translator):
+        self.translator = translator
+        self.lock = threading.Lock()
+        self.turns = [] # {"role": "user"|"assistant", "content": ..., "tokens": ...}
+        self.summary = ""
+        self.generation = 0 # bumped by clear(), so a fold in progress is discarded
+        self.folding = False
+        self.folds = 0
+
+    def budget(self):
+        return config_manager.get("llm_history_tokens", 3000)
+
+    def clear(self):
+        with self.lock:
+            self.turns = []
+            self.summary = ""
+            self.generation += 1
+
+    def add(self, role, content):
+        """Append a turn. Returns it, for discard()."""
+        turn = {"role": role, "content": content, "tokens": message_tokens({"content": content})}
+        with self.lock:
+            self.turns.append(turn)
+        return turn
+
+    def discard(self, turn):
+        """Take back a turn whose request was cancelled (a no-op once it was folded or cleared)."""
+        with self.lock:
+            if any(t is turn for t in self.turns):
+                self.turns = [t for t in self.turns if t is not turn]
+
+    def _system_message(self):
+        content = SYSTEM_PROMPT
+        if self.summary:
+            content += f"\n\nSummary of the meeting conversation so far:\n{self.summary}"
+        return {"role": "system", "content": content}
+
+    def messages(self):
+        """
+        A new list to send: the system message (with the summary) and the
+        newest turns that fit the budget. The latest turn is always included.
+        """
+        with self.lock:
+            system = self._system_message()
+            remaining = self.budget() - message_tokens(system)
+            recent = []
+            for turn in reversed(self.turns):
+                if recent and turn["tokens"] > remaining:
+                    break # turns waiting to be folded are left out meanwhile
+                recent.append({"role": turn["role"], "content": turn["content"]})
+                remaining -= turn["tokens"]
+            return [system] + recent[::-1]
+
+    def tokens(self):
+        """Size of the request messages() would build now."""
+        return sum(message_tokens(m) for m in self.messages())
+
+    def compact(self):
+        """
+        Fold the oldest turns into the summary while the history is over
+        budget. Blocks on an LLM call, so call it after the reply is shown.
+        """
+        with self.lock:
+            total = message_tokens(self._system_message()) + sum(t["tokens"] for t in self.turns)
+            if self.folding or total <= self.budget():
+                return
+            # Fold down to three quarters of the budget, so folds don't happen on every turn
+            target = total - int(self.budget() * 0.75)
+            count = 0
+            folded_tokens = 0
+            # Keep at least the latest exchange verbatim
+            while count < len(self.turns) - 2 and folded_tokens < target:
+                folded_tokens += self.turns[count]["tokens"]
+                count += 1
+            if count == 0:
+                return
+            old = [{"role": t["role"], "content": t["content"]} for t in self.turns[:count]]
+            summary = self.summary
+            generation = self.generation
+            self.folding = True
+
+        try:
+            new_summary = self.translator.summarize(summary, old)
+        except Exception as e:
+            # The turns stay and are retried on the next compact(); messages() keeps the request in budget
+            logger.error(f"History summarization failed: {e}")
+            new_summary = None
+
+        with self.lock:
+            self.folding = False
+            if new_summary is None or generation != self.generation:
+                return
+            self.summary = new_summary
+            # Only appends happen meanwhile, so the folded turns are still the oldest
+            del self.turns[:count]
+            self.folds += 1
+        logger.info(f"Folded {count} chat turns ({folded_tokens} tokens) into the running summary.")
+
+    def stats(self):
+        with self.lock:
+            return {
+                "turns": len(self.turns),
+                "summary_tokens": count_tokens(self.summary),
+                "folds": self.folds,
+            }
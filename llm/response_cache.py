@@ -0,0 +1,133 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from utils.logger import logger
+
+CACHE_FILE = os.path.join("cache", "llm_responses.json")
+
+
+def cache_key(model, messages, params):
+    """sha256 of the model, the messages with whitespace normalized, and the generation parameters."""
+    normalized = [{"role": m["role"], "content": re.sub(r"\s+", " ", m["content"]).strip()} for m in messages]
+    payload = json.dumps({"model": model, "messages": normalized, "params": params},
+                         sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    LLM replies by request key, least recently used evicted first.
+
+    At most max_entries replies are kept, each for ttl_seconds. Lookups are
+    a dict access; the cache is loaded from disk on first use. New replies
+    are written back (atomically) on a background timer save_delay seconds
+    later, so a reply is never held up by the write and a burst of replies
+    costs one; flush() writes them right away, e.g. on exit.
+    """
+
+    def __init__(self, path=CACHE_FILE, max_entries=500, ttl_seconds=7 * 24 * 3600, save_delay=2.0):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.save_delay = save_delay
+        self.lock = threading.Lock()
+        self.save_lock = threading.Lock() # one writer of the file at a time
+        self._entries = None # key -> (created, reply), loaded lazily
+        self._dirty = False # replies added since the last write
+        self._save_timer = None
+        self.hits = 0
+        self.misses = 0
+        self.saves = 0
+
+    def _load(self):
+        # Called with self.lock held
+        if self._entries is not None:
+            return
+        self._entries = OrderedDict()
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                for key, created, reply in json.load(f):
+                    self._entries[key] = (created, reply)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable LLM cache {self.path}: {e}")
+        self._evict()
+
+    def _evict(self):
+        now = time.time()
+        for key in [k for k, (created, _) in self._entries.items() if now - created > self.ttl_seconds]:
+            del self._entries[key]
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, key):
+        with self.lock:
+            self._load()
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry[0] > self.ttl_seconds:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, reply):
+        with self.lock:
+            self._load()
+            self._entries[key] = (time.time(), reply)
+            self._entries.move_to_end(key)
+            self._evict()
+            self._dirty = True
+            if self._save_timer is None:
+                self._save_timer = threading.Timer(self.save_delay, self.flush)
+                self._save_timer.daemon = True
+                self._save_timer.start()
+
+    def flush(self):
+        """Write replies added since the last write to disk now."""
+        with self.lock:
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+                self._save_timer = None
+            if not self._dirty:
+                return
+            self._dirty = False
+            data = [[k, created, r] for k, (created, r) in self._entries.items()]
+        self._save(data)
+
+    def _save(self, data):
+        try:
+            with self.save_lock:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                tmp = f"{self.path}.tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(data, f, ensure_ascii=False)
+                os.replace(tmp, self.path)
+                self.saves += 1
+        except Exception as e:
+            logger.error(f"Could not write LLM cache: {e}")
+
+    def clear(self):
+        with self.lock:
+            self._entries = OrderedDict()
+            self._dirty = True
+        self.flush()
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries or ()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "saves": self.saves,
+            }
@@ -0,0 +1,159 @@
+import threading
+import time
+from utils.logger import logger
+from utils.tracing import tracer
+
+
+class LLMTurn:
+    def __init__(self, text, trace_id):
+        self.texts = [text]
+        self.trace_id = trace_id
+        self.submitted_at = time.monotonic() # first send, for the queue wait
+        self.last_submit = self.submitted_at # latest send folded in, for coalescing
+        self.cancel = threading.Event()
+
+
+class LLMScheduler:
+    """
+    Runs chat turns one at a time on a single worker thread.
+
+    process_fn(text, trace_id, cancel) runs a turn; cancel is a
+    threading.Event that is set when the turn is cancelled or superseded, and
+    the turn should then stop and leave the history as it was. Sends made
+    while a turn is waiting are coalesced into it (texts joined in order);
+    a waiting turn starts once no send came for coalesce_window seconds, so
+    a double press costs one request. Waiting sends keep the first trace.
+    """
+
+    def __init__(self, process_fn, coalesce_window=0.25):
+        self.process_fn = process_fn
+        self.coalesce_window = coalesce_window
+        self._cond = threading.Condition()
+        self._pending = None # the next turn, still collecting sends
+        self._current = None # the turn being processed
+
+        # Counters exposed through stats()
+        self.submitted = 0
+        self.started = 0
+        self.coalesced = 0
+        self.completed = 0
+        self.cancelled = 0
+        self.superseded = 0
+        self.last_wait = 0.0
+        self.max_wait = 0.0
+        self.total_wait = 0.0
+
+        self._worker = threading.Thread(target=self._worker_loop, name="llm-scheduler", daemon=True)
+        self._worker.start()
+
+    def submit(self, text, trace_id=None, supersede=False):
+        """
+        Queue text as the next turn. With supersede=True a turn in progress
+        is cancelled and its text is sent again together with this one.
+        Returns False when the text was folded into a waiting turn.
+        """
+        with self._cond:
+            self.submitted += 1
+            if supersede and self._current is not None and not self._current.cancel.is_set():
+                current = self._current
+                current.cancel.set()
+                self.superseded += 1
+                tracer.discard(current.trace_id)
+                if self._pending is None:
+                    self._pending = LLMTurn(text, trace_id)
+                    self._pending.texts = current.texts + self._pending.texts
+                else:
+                    self._pending.texts = current.texts + self._pending.texts + [text]
+                    tracer.discard(trace_id)
+                self._pending.last_submit = time.monotonic()
+                logger.info("LLM request superseded by a new send.")
+                self._cond.notify_all()
+                return True
+            if self._pending is not None:
+                self._pending.texts.append(text)
+                self._pending.last_submit = time.monotonic()
+                self.coalesced += 1
+                tracer.discard(trace_id)
+                self._cond.notify_all()
+                return False
+            self._pending = LLMTurn(text, trace_id)
+            self._cond.notify_all()
+            return True
+
+    def cancel(self):
+        """Cancel the turn in progress and drop the waiting one. Returns True if there was anything to cancel."""
+        with self._cond:
+            turns = [turn for turn in (self._current, self._pending) if turn is not None and not turn.cancel.is_set()]
+            for turn in turns:
+                turn.cancel.set()
+                tracer.discard(turn.trace_id)
+            self.cancelled += len(turns)
+            self._pending = None
+            self._cond.notify_all()
+        return bool(turns)
+
+    def busy(self):
+        with self._cond:
+            return self._current is not None or self._pending is not None
+
+    def wait_idle(self, timeout=None):
+        """Block until no turn is waiting or in progress. Returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._current is not None or self._pending is not None:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def stats(self):
+        with self._cond:
+            waits = self.started or 1
+            return {
+                "waiting": int(self._pending is not None),
+                "in_flight": int(self._current is not None),
+                "submitted": self.submitted,
+                "coalesced": self.coalesced,
+                "completed": self.completed,
+                "cancelled": self.cancelled,
+                "superseded": self.superseded,
+                "last_wait": self.last_wait,
+                "avg_wait": self.total_wait / waits,
+                "max_wait": self.max_wait,
+            }
+
+    def _worker_loop(self):
+        while True:
+            with self._cond:
+                while True:
+                    if self._pending is None:
+                        self._cond.wait()
+                        continue
+                    # Debounce: start once the sends have stopped coming
+                    remaining = self._pending.last_submit + self.coalesce_window - time.monotonic()
+                    if remaining > 0:
+                        self._cond.wait(remaining)
+                        continue
+                    break
+                turn = self._current = self._pending
+                self._pending = None
+                self.started += 1
+                wait = time.monotonic() - turn.submitted_at
+                self.last_wait = wait
+                self.max_wait = max(self.max_wait, wait)
+                self.total_wait += wait
+
+            if len(turn.texts) > 1:
+                logger.info(f"Coalesced {len(turn.texts)} sends into one LLM request.")
+            logger.debug(f"LLM request waited {wait:.2f}s")
+            try:
+                self.process_fn(" ".join(turn.texts), turn.trace_id, turn.cancel)
+            except Exception as e:
+                logger.error(f"LLM scheduler error: {e}")
+
+            with self._cond:
+                self._current = None
+                if not turn.cancel.is_set():
+                    self.completed += 1
+                self._cond.notify_all()
@@ -1,50 +1,120 @@
-import openai
-from openai import OpenAI
 from utils.logger import logger
 from utils.config_manager import config_manager
+from utils.openai_client import openai_clients
 from llm.prompt_manager import PromptManager
+from llm.response_cache import ResponseCache, cache_key
+
+SYSTEM_PROMPT = "You are a helpful real-time meeting assistant."
+
+SUMMARY_PROMPT = (
+    "You keep a concise running summary of a meeting conversation between a user and an AI assistant. "
+    "Keep decisions, names, numbers, action items and open questions; drop small talk. "
+    "Reply with the updated summary only."
+)
+
+
+def token_param(model):
+    # Newer models take max_completion_tokens instead of max_tokens
+    if model.startswith("o1") or "gpt-5" in model:
+        return "max_completion_tokens"
+    return "max_tokens"
+
 
 class Translator:
     def __init__(self):
         self.prompt_manager = PromptManager()
-        self.api_key = config_manager.get("openai_api_key", "")
-        self.client = None
-        if self.api_key:
-            self.client = OpenAI(api_key=self.api_key)
+        self.cache = ResponseCache(max_entries=config_manager.get("llm_cache_size", 500),
+                                   ttl_seconds=config_manager.get("llm_cache_ttl_hours", 168) * 3600)
 
-    def update_api_key(self, key):
-        self.api_key = key
-        self.client = OpenAI(api_key=key)
+    def get_client(self):
+        # The app-wide client, which follows openai_api_key and openai_base_url
+        # (e.g. pointed at the benchmark stub) and shares its connections with WhisperCloud
+        return openai_clients.get()
 
     def process(self, transcript):
         # Legacy method for single-turn (kept for compatibility if needed, but we'll switch to history)
         return self.process_with_history([{"role": "user", "content": transcript}])
 
-    def process_with_history(self, messages):
-        if not self.client:
+    def process_with_history(self, messages, on_delta=None, cancel=None):
+        """
+        Send the chat and return the reply text.
+        With on_delta (and llm_streaming on), the reply is streamed and
+        on_delta(text) is called with each piece as it arrives.
+        With llm_cache_enabled, meant for prompt templates whose reply depends
+        on the new text alone (translate, rewrite), a prompt seen before is
+        answered from the response cache whatever the turns before it
+        (on_delta gets the whole reply at once).
+        Returns None if the cancel event (a threading.Event) gets set first;
+        a stream is closed right away, a plain request's reply is discarded.
+        """
+        model = config_manager.get("llm_model", "gpt-3.5-turbo")
+
+        # Ensure system message exists if not provided (without touching the caller's list)
+        if not any(m['role'] == 'system' for m in messages):
+            messages = [{"role": "system", "content": SYSTEM_PROMPT}] + list(messages)
+
+        params = {token_param(model): 1000}
+        key = None
+        if config_manager.get("llm_cache_enabled", False):
+            # Keyed on the templated prompt alone: the history and summary in front of it
+            # differ on every request of a meeting, and would keep the cache from ever hitting
+            key = cache_key(model, messages[-1:], params)
+            cached = self.cache.get(key)
+            if cached is not None:
+                logger.info(f"LLM reply served from cache (hit ratio {self.cache.stats()['hit_ratio']:.0%}).")
+                if on_delta:
+                    on_delta(cached)
+                return cached
+
+        client = self.get_client()
+        if not client:
             logger.warning("OpenAI API Key not set for LLM.")
             return "Error: API Key missing"
-
-        model = config_manager.get("llm_model", "gpt-3.5-turbo")
+        if cancel and cancel.is_set():
+            return None
 
         try:
-            # Determine token parameter based on model
-            token_param = "max_tokens"
-            if model.startswith("o1") or "gpt-5" in model:
-                token_param = "max_completion_tokens"
-            
-            # Ensure system message exists if not provided
-            if not any(m['role'] == 'system' for m in messages):
-                messages.insert(0, {"role": "system", "content": "You are a helpful real-time meeting assistant."})
-
-            kwargs = {
-                "model": model,
-                "messages": messages,
-                token_param: 1000
-            }
-
-            response = self.client.chat.completions.create(**kwargs)
-            return response.choices[0].message.content.strip()
+            kwargs = {"model": model, "messages": messages, **params}
+
+            if on_delta and config_manager.get("llm_streaming", True):
+                parts = []
+                stream = client.chat.completions.create(stream=True, **kwargs)
+                for chunk in stream:
+                    if cancel and cancel.is_set():
+                        stream.close() # drops the connection, the server stops generating
+                        return None
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if delta:
+                        parts.append(delta)
+                        on_delta(delta)
+                reply = "".join(parts).strip()
+            else:
+                response = client.chat.completions.create(**kwargs)
+                reply = response.choices[0].message.content.strip()
+            if cancel and cancel.is_set():
+                return None
+            # Only real replies are cached, never the error strings below
+            if key and reply:
+                self.cache.put(key, reply)
+            return reply
         except Exception as e:
             logger.error(f"LLM Error: {e}")
             return f"Error: {str(e)}"
+
+    def summarize(self, summary, turns):
+        """Fold chat turns into the running summary. Raises on failure, unlike process_with_history."""
+        client = self.get_client()
+        if not client:
+            raise RuntimeError("OpenAI API Key not set for LLM.")
+        model = config_manager.get("llm_model", "gpt-3.5-turbo")
+        conversation = "\n".join(f"{t['role']}: {t['content']}" for t in turns)
+        response = client.chat.completions.create(
+            model=model,
+            messages=[
+                {"role": "system", "content": SUMMARY_PROMPT},
+                {"role": "user", "content": f"Current summary:\n{summary or '(none yet)'}\n\n"
+                                            f"Conversation to fold in:\n{conversation}"},
+            ],
+            **{token_param(model): config_manager.get("llm_summary_tokens", 500)}
+        )
+        return response.choices[0].message.content.strip()
@@ -1,17 +1,25 @@
+from utils.startup import startup, BENCH_EXIT_AFTER_PAINT # first, so startup timings begin here
 import sys
 import threading
+import time
 from PySide6.QtWidgets import QApplication
-from PySide6.QtCore import QObject, Signal, Slot
+from PySide6.QtCore import QObject, Signal, Slot, QTimer
 from ui.overlay import OverlayWindow
 from ui.settings_window import SettingsWindow
 from ui.hotkeys import HotkeyManager
 from audio.audio_listener import AudioListener
 from llm.translator import Translator
+from llm.history_manager import HistoryManager
+from llm.scheduler import LLMScheduler
 from utils.logger import logger
+from utils.config_manager import config_manager
+from utils.tracing import tracer
+from utils.openai_client import openai_clients
 
 class MainApp(QObject):
     # Signals to update UI from other threads
     update_overlay_signal = Signal(str, str) # role, text
+    traced_overlay_signal = Signal(str, str, str, str) # role, text, trace id, source label
     
     # Signals for hotkey actions (to run on main thread)
     toggle_transcription_signal = Signal()
@@ -19,8 +27,11 @@ class MainApp(QObject):
     open_settings_signal = Signal()
     copy_transcript_signal = Signal()
     send_ai_signal = Signal()
+    resend_ai_signal = Signal()
+    cancel_ai_signal = Signal()
     clear_text_signal = Signal()
     scroll_signal = Signal(str)
+    input_finished_signal = Signal()
     exit_app_signal = Signal()
 
     def __init__(self):
@@ -31,17 +42,24 @@ class MainApp(QObject):
         
         self.is_transcribing = False
         self.accumulated_transcript = [] # List to store transcript chunks
-        self.chat_history = [] # List of {"role": "user"|"assistant", "content": "..."}
+        self.history = HistoryManager(self.translator) # recent turns plus a running summary
+        # One request at a time, in order; quick repeated sends become one request
+        self.llm_scheduler = LLMScheduler(self.process_llm,
+                                          coalesce_window=config_manager.get("llm_coalesce_ms", 250) / 1000)
         self.last_transcript = ""
 
         # Audio Listener
         self.audio_listener = AudioListener(
             on_transcript_callback=self.on_transcript_received,
-            on_error_callback=self.on_audio_error
+            on_error_callback=self.on_audio_error,
+            on_partial_callback=self.on_partial_transcript,
+            on_status_callback=lambda msg: self.update_overlay_signal.emit("System", msg),
+            on_finished_callback=self.input_finished_signal.emit
         )
 
         # Connect Signals
         self.update_overlay_signal.connect(self.overlay.add_message)
+        self.traced_overlay_signal.connect(self.overlay.add_message)
         self.settings.settings_changed.connect(self.reload_settings)
         self.settings.lock_overlay_toggled.connect(self.overlay.set_click_through)
         
@@ -59,9 +77,14 @@ class MainApp(QObject):
         
         # Connect new signals
         self.send_ai_signal.connect(self.send_to_ai)
+        self.resend_ai_signal.connect(lambda: self.send_to_ai(supersede=True))
+        self.cancel_ai_signal.connect(self.cancel_ai)
         self.clear_text_signal.connect(self.clear_text)
         self.scroll_signal.connect(self.overlay.scroll_content)
+        self.input_finished_signal.connect(self.on_input_finished)
         self.exit_app_signal.connect(QApplication.instance().quit)
+        # Cached AI replies are written in the background; write the last ones before exiting
+        QApplication.instance().aboutToQuit.connect(self.translator.cache.flush)
 
         # Hotkeys (Ctrl + Alt + Key) - 'fn' is usually not mappable by OS, using Alt instead
         self.hotkeys = HotkeyManager({
@@ -70,28 +93,44 @@ class MainApp(QObject):
             'open_settings': self.open_settings_signal.emit,
             'copy_transcript': self.copy_transcript_signal.emit,
             'send_to_ai': self.send_ai_signal.emit,
+            'resend_to_ai': self.resend_ai_signal.emit,
+            'cancel_ai': self.cancel_ai_signal.emit,
             'clear_text': self.clear_text_signal.emit,
             'scroll_up': lambda: self.scroll_signal.emit("up"),
             'scroll_down': lambda: self.scroll_signal.emit("down"),
             'exit_app': self.exit_app_signal.emit
         })
 
-        # Preload Models
+        # Show the windows first, models load in a tracked background stage
         self.overlay.show()
         self.settings.show() 
+        startup.mark("windows_shown")
         self.update_overlay_signal.emit("System", "Initializing AI Models... Please wait.")
         self.audio_listener.preload()
-        self.update_overlay_signal.emit("System", "Ready!")
 
-    def on_transcript_received(self, text):
-        # Store transcript
-        self.accumulated_transcript.append(text)
+        # Pipeline health (backlog, waits, capture losses, gate) goes to the log while listening
+        self.stats_timer = QTimer(self)
+        self.stats_timer.setInterval(int(config_manager.get("stats_log_seconds", 60) * 1000))
+        self.stats_timer.timeout.connect(self.audio_listener.log_stats)
+        # Connect to the API in the background, so the first request skips DNS, TCP and TLS setup
+        openai_clients.warm()
+
+    def on_transcript_received(self, text, trace_id=None, source=""):
+        tracer.mark(trace_id, "callback")
+        # Store transcript; with several inputs each line says who spoke
+        self.accumulated_transcript.append(f"{source}: {text}" if source else text)
         self.last_transcript = text
+        # A send is likely to follow; reconnect if the pooled connections have expired
+        openai_clients.warm_if_idle()
         # Show raw transcript immediately
-        self.update_overlay_signal.emit("Transcript", text)
+        self.traced_overlay_signal.emit("Transcript", text, trace_id or "", source)
+
+    def on_partial_transcript(self, text, source=""):
+        # Provisional text for a segment still being spoken, replaced by the final transcript
+        self.traced_overlay_signal.emit("Partial", text, "", source)
 
     @Slot()
-    def send_to_ai(self):
+    def send_to_ai(self, supersede=False):
         if not self.accumulated_transcript:
             self.update_overlay_signal.emit("System", "No new transcript to send.")
             return
@@ -102,19 +141,34 @@ class MainApp(QObject):
         # Clear the buffer immediately so subsequent speech is treated as new
         self.accumulated_transcript = []
         
-        self.update_overlay_signal.emit("System", "Sending to AI...")
+        trace_id = tracer.begin("llm", "request")
         
-        # Process with LLM in background
-        threading.Thread(target=self.process_llm, args=(new_text,)).start()
+        # Process with LLM in background, after any request already running
+        if not self.llm_scheduler.submit(new_text, trace_id, supersede=supersede):
+            self.update_overlay_signal.emit("System", "Added to the pending AI request.")
+        elif supersede:
+            self.update_overlay_signal.emit("System", "Sending to AI (replacing the running request)...")
+        else:
+            self.update_overlay_signal.emit("System", "Sending to AI...")
+
+    @Slot()
+    def cancel_ai(self):
+        if self.llm_scheduler.cancel():
+            self.update_overlay_signal.emit("System", "AI request cancelled.")
+        else:
+            self.update_overlay_signal.emit("System", "No AI request to cancel.")
 
     @Slot()
     def clear_text(self):
         self.accumulated_transcript = []
-        self.chat_history = []
-        self.overlay.text_browser.clear()
+        self.llm_scheduler.cancel() # a reply in progress belongs to the cleared chat
+        self.history.clear()
+        self.overlay.clear_messages()
         self.update_overlay_signal.emit("System", "Transcript and Chat History cleared.")
 
-    def process_llm(self, new_text):
+    def process_llm(self, new_text, trace_id=None, cancel=None):
+        # Runs on the scheduler's worker, one turn at a time
+        streamed = []
         try:
             logger.info(f"Sending text to LLM: {new_text[:50]}...")
             
@@ -125,19 +179,48 @@ class MainApp(QObject):
             # To respect the user's config "prompt_template", we can use it to format the user message.
             
             prompt = self.translator.prompt_manager.get_prompt(new_text)
-            self.chat_history.append({"role": "user", "content": prompt})
+            user_turn = self.history.add("user", prompt)
             
-            # Send full history
-            response = self.translator.process_with_history(self.chat_history)
+            # Send the history within its token budget; a streamed reply grows in the overlay as it arrives
+            tracer.mark(trace_id, "llm_start")
+            last_update = 0.0
+
+            def on_delta(text):
+                nonlocal last_update
+                if not streamed:
+                    tracer.mark(trace_id, "first_token")
+                streamed.append(text)
+                # Re-rendering the block per token would flood the UI thread
+                now = time.monotonic()
+                if now - last_update >= 0.05:
+                    last_update = now
+                    self.update_overlay_signal.emit("AIStream", "".join(streamed))
+
+            response = self.translator.process_with_history(self.history.messages(), on_delta=on_delta,
+                                                            cancel=cancel)
+            if response is None:
+                # Cancelled or superseded: the turn never happened
+                self.history.discard(user_turn)
+                if streamed:
+                    self.update_overlay_signal.emit("AI", "".join(streamed) + " …")
+                return
+            tracer.mark(trace_id, "llm_end")
             
             logger.info(f"LLM Response: {response[:50]}...")
             
             # Add assistant response to history
-            self.chat_history.append({"role": "assistant", "content": response})
+            self.history.add("assistant", response)
             
-            self.update_overlay_signal.emit("AI", response)
+            self.traced_overlay_signal.emit("AI", response, trace_id or "", "")
+            # Summarize turns that fell out of the budget while the reply is being read,
+            # without holding up the next request
+            threading.Thread(target=self.history.compact, daemon=True).start()
         except Exception as e:
+            tracer.discard(trace_id)
             logger.error(f"LLM processing failed: {e}")
+            if streamed:
+                # Close the growing block with what did arrive
+                self.update_overlay_signal.emit("AI", "".join(streamed))
             self.update_overlay_signal.emit("System", f"AI Error: {e}")
 
     def on_audio_error(self, msg):
@@ -155,6 +238,7 @@ class MainApp(QObject):
         if not self.is_transcribing:
             self.audio_listener.start()
             self.is_transcribing = True
+            self.stats_timer.start()
             self.update_overlay_signal.emit("System", "Listening started...")
 
     @Slot()
@@ -163,6 +247,26 @@ class MainApp(QObject):
             self.audio_listener.stop()
             self.is_transcribing = False
             self.update_overlay_signal.emit("System", "Listening stopped.")
+            self.report_session_stats()
+
+    @Slot()
+    def on_input_finished(self):
+        # A replayed audio file reached its end
+        self.is_transcribing = False
+        self.update_overlay_signal.emit("System", "Audio file finished.")
+        self.report_session_stats()
+
+    def report_session_stats(self):
+        self.stats_timer.stop()
+        stats = self.audio_listener.log_stats()
+        if not stats:
+            return
+        summary = f"{stats['completed']} segments transcribed, average wait {stats['avg_wait']:.1f}s"
+        if stats["merged"] or stats["dropped"]:
+            summary += f", {stats['merged']} merged / {stats['dropped']} dropped under load"
+        if stats.get("capture_dropped_frames"):
+            summary += f", {stats['capture_dropped_frames']} audio frames lost"
+        self.update_overlay_signal.emit("System", summary + ".")
 
     @Slot()
     def toggle_overlay(self):
@@ -186,11 +290,17 @@ class MainApp(QObject):
     @Slot()
     def reload_settings(self):
         self.overlay.apply_settings()
-        self.translator.update_api_key(self.settings.api_key_input.text())
+        # The shared OpenAI client picks up a new key by itself and keeps its pooled connections
+        openai_clients.warm_if_idle()
+        # Transcription mode or model size changes swap the engine in the background
+        self.audio_listener.reload_engine()
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
     app.setQuitOnLastWindowClosed(False) # Keep running even if windows closed
+    startup.budget_ms = config_manager.get("startup_budget_ms", 1500)
+    if BENCH_EXIT_AFTER_PAINT:
+        startup.on_first_paint.append(lambda: (startup.dump_report(), QTimer.singleShot(0, app.quit)))
     
     main_app = MainApp()
     
@@ -20,6 +20,8 @@ class HotkeyManager:
             
             # AI Controls
             keyboard.add_hotkey('ctrl+alt+enter', self.callbacks.get('send_to_ai', lambda: None))
+            keyboard.add_hotkey('ctrl+alt+shift+enter', self.callbacks.get('resend_to_ai', lambda: None))
+            keyboard.add_hotkey('ctrl+alt+x', self.callbacks.get('cancel_ai', lambda: None))
             keyboard.add_hotkey('ctrl+alt+backspace', self.callbacks.get('clear_text', lambda: None))
             
             # Scroll Controls
@@ -1,11 +1,12 @@
 import sys
 import ctypes
-import markdown
 from PySide6.QtWidgets import QWidget, QVBoxLayout, QApplication, QTextBrowser, QFrame
-from PySide6.QtGui import QFont, QColor, QScreen
+from PySide6.QtGui import QFont, QColor, QScreen, QTextCursor
 from PySide6.QtCore import Qt, Slot
 from utils.config_manager import config_manager
 from utils.logger import logger
+from utils.startup import startup
+from utils.tracing import tracer
 
 # Windows API for hiding from capture
 user32 = ctypes.windll.user32
@@ -57,6 +58,12 @@ class OverlayWindow(QWidget):
         self.set_click_through(True)
         
         self.last_role = None
+        self.last_source = "" # input label of the last transcript line
+        # Document spans that are rewritten in place, as (start, end) positions:
+        # "partial:<source>" is an input's provisional transcript, "ai" the reply being streamed
+        self.live_ranges = {}
+        self.partials = {} # source -> provisional text shown for it
+        self.partial_inline = {} # source -> partial continues that input's transcript line
 
     def center_on_screen(self):
         screen = QApplication.primaryScreen().availableGeometry()
@@ -134,11 +141,118 @@ class OverlayWindow(QWidget):
         
         self.show()
 
+    def clear_messages(self):
+        self.text_browser.clear()
+        self.live_ranges = {}
+        self.partials = {}
+        self.partial_inline = {}
+        self.last_role = None
+        self.last_source = ""
+
+    def set_live(self, key, html, new_block=True):
+        """Insert html as live range key (at the end the first time), replacing its previous content."""
+        cursor = QTextCursor(self.text_browser.document())
+        old = self.live_ranges.get(key)
+        if old:
+            start = old[0]
+            self.remove_live(key)
+            cursor.setPosition(start)
+        else:
+            cursor.movePosition(QTextCursor.End)
+            start = cursor.position()
+        if new_block and not self.text_browser.document().isEmpty():
+            cursor.insertBlock()
+        cursor.insertHtml(html)
+        end = cursor.position()
+        self._shift_live(start, end - start)
+        self.live_ranges[key] = (start, end)
+
+    def remove_live(self, key):
+        span = self.live_ranges.pop(key, None)
+        if not span:
+            return
+        start, end = span
+        cursor = QTextCursor(self.text_browser.document())
+        cursor.setPosition(start)
+        cursor.setPosition(end, QTextCursor.KeepAnchor)
+        cursor.removeSelectedText()
+        self._shift_live(start, start - end)
+
+    def _shift_live(self, pos, delta):
+        # Live ranges after an edit at pos move with the text
+        for key, (start, end) in self.live_ranges.items():
+            if start >= pos:
+                self.live_ranges[key] = (start + delta, end + delta)
+
+    def show_partial(self, text, source=""):
+        """Show or replace the provisional transcript of the segment being spoken on one input."""
+        key = f"partial:{source}"
+        if key not in self.live_ranges:
+            # Continue the current transcript line if there is one from the same input,
+            # unless another input's partial already follows it
+            self.partial_inline[source] = (self.last_role == "Transcript" and self.last_source == source
+                                           and not self.partials)
+        self.partials[source] = text
+
+        inline = self.partial_inline[source]
+        html = f'<span style="color: #777777;"><i> {text}</i></span>'
+        if not inline:
+            html = f'<span style="color: #777777; font-weight: bold;">🎤 {source or "Transcript"}:</span>{html}'
+        self.set_live(key, html, new_block=not inline)
+        self.text_browser.moveCursor(self.text_browser.textCursor().MoveOperation.End)
+
+    def remove_partial(self, source=""):
+        self.partials.pop(source, None)
+        self.partial_inline.pop(source, None)
+        self.remove_live(f"partial:{source}")
+
+    def ai_html(self, text):
+        color = config_manager.get("font_color", "#FFFFFF") # User color for AI
+        try:
+            import markdown # Deferred: only needed once the first AI answer arrives
+            # Convert markdown to HTML
+            # extensions=['fenced_code', 'codehilite'] can be used if we want more features
+            html_content = markdown.markdown(text, extensions=['fenced_code', 'nl2br'])
+            # Wrap in a div with the role label
+            return f'<div style="margin-bottom: 10px; margin-top: 10px;"><span style="color: {color}; font-weight: bold; font-size: 1.1em;">🤖 AI:</span><br>{html_content}</div>'
+        except Exception as e:
+            logger.error(f"Markdown rendering failed: {e}")
+            # Fallback to plain text
+            return f'<div style="margin-bottom: 10px;"><span style="color: {color}; font-weight: bold;">🤖 AI:</span> <span style="color: {color};">{text}</span></div>'
+
+    def show_ai_stream(self, text):
+        """Grow the AI reply that is still streaming in; the final "AI" message replaces it."""
+        self.set_live("ai", self.ai_html(text))
+        # Transcripts arriving meanwhile start a new line below the reply
+        self.last_role = "AI"
+        self.last_source = ""
+        self.text_browser.moveCursor(self.text_browser.textCursor().MoveOperation.End)
+
     @Slot(str, str)
-    def add_message(self, role, text):
+    @Slot(str, str, str)
+    @Slot(str, str, str, str)
+    def add_message(self, role, text, trace_id=None, source=""):
         """
-        role: 'System', 'Transcript', 'AI'
+        role: 'System', 'Transcript', 'AI', 'Partial', 'AIStream'
+        trace_id: latency trace to finish once the text is in the document
+        source: input label ("Me", "Remote") shown instead of the role for transcripts
         """
+        if role == "Partial":
+            self.show_partial(text, source)
+            return
+        if role == "AIStream":
+            self.show_ai_stream(text)
+            return
+        others = {}
+        if role == "Transcript":
+            # The final text replaces its input's provisional one. Other inputs'
+            # partials are taken off and shown again below, so the final text
+            # lands on its own line rather than after them
+            self.remove_partial(source)
+            others = dict(self.partials)
+            for other in others:
+                self.remove_partial(other)
+
         color = config_manager.get("font_color", "#FFFFFF")
         prefix = ""
         
@@ -152,37 +266,34 @@ class OverlayWindow(QWidget):
             color = "#FFFF00" # Yellow for system
             prefix = "⚙️ "
 
-        # Smart Appending: If same role (and it's Transcript), append to same line
-        if self.last_role == role and role == "Transcript":
+        # Smart Appending: If same role (and it's Transcript from the same input), append to same line
+        if self.last_role == role and role == "Transcript" and self.last_source == source:
             self.text_browser.moveCursor(self.text_browser.textCursor().MoveOperation.End)
             # Add a space before the new text
             html = f'<span style="color: {color};"> {text}</span>'
             self.text_browser.insertHtml(html)
         else:
             # New block
-            if role == "AI":
+            if role == "AI" and "ai" in self.live_ranges:
+                # The streamed block becomes the final, fully rendered reply
+                self.set_live("ai", self.ai_html(text))
+                del self.live_ranges["ai"]
+            elif role == "AI":
                 # Render Markdown for AI
-                try:
-                    # Convert markdown to HTML
-                    # extensions=['fenced_code', 'codehilite'] can be used if we want more features
-                    html_content = markdown.markdown(text, extensions=['fenced_code', 'nl2br'])
-                    
-                    # Wrap in a div with the role label
-                    html = f'<div style="margin-bottom: 10px; margin-top: 10px;"><span style="color: {color}; font-weight: bold; font-size: 1.1em;">{prefix}{role}:</span><br>{html_content}</div>'
-                    self.text_browser.append(html)
-                except Exception as e:
-                    logger.error(f"Markdown rendering failed: {e}")
-                    # Fallback to plain text
-                    html = f'<div style="margin-bottom: 10px;"><span style="color: {color}; font-weight: bold;">{prefix}{role}:</span> <span style="color: {color};">{text}</span></div>'
-                    self.text_browser.append(html)
+                self.text_browser.append(self.ai_html(text))
             else:
-                html = f'<div style="margin-bottom: 10px;"><span style="color: {color}; font-weight: bold;">{prefix}{role}:</span> <span style="color: {color};">{text}</span></div>'
+                label = source if role == "Transcript" and source else role
+                html = f'<div style="margin-bottom: 10px;"><span style="color: {color}; font-weight: bold;">{prefix}{label}:</span> <span style="color: {color};">{text}</span></div>'
                 self.text_browser.append(html)
         
         self.last_role = role
+        self.last_source = source
+        for other, partial in others.items():
+            self.show_partial(partial, other)
         
         # Auto scroll to bottom
         self.text_browser.moveCursor(self.text_browser.textCursor().MoveOperation.End)
+        tracer.finish(trace_id, "render")
 
     @Slot(str)
     def scroll_content(self, direction):
@@ -198,6 +309,10 @@ class OverlayWindow(QWidget):
         # For simple status updates, we can just append a system message
         self.add_message("System", text)
         
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        startup.first_paint()
+
     def mousePressEvent(self, event):
         if event.button() == Qt.LeftButton:
             self.drag_pos = event.globalPos() - self.frameGeometry().topLeft()
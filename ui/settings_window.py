@@ -1,8 +1,7 @@
 from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
                                QLineEdit, QTextEdit, QComboBox, QSlider, 
                                QPushButton, QColorDialog, QCheckBox, QGroupBox, QScrollArea, QApplication)
-from PySide6.QtCore import Qt, Signal
-import sounddevice as sd
+from PySide6.QtCore import Qt, Signal, QTimer
 from utils.config_manager import config_manager
 
 class SettingsWindow(QWidget):
@@ -102,15 +101,28 @@ class SettingsWindow(QWidget):
         
         trans_layout.addWidget(QLabel("Mode:"))
         self.mode_combo = QComboBox()
-        self.mode_combo.addItems(["local", "cloud"])
+        self.mode_combo.addItems(["local", "faster", "cloud"])
         self.mode_combo.setCurrentText(config_manager.get("transcription_mode", "local"))
-        self.mode_combo.currentTextChanged.connect(lambda t: self.update_config("transcription_mode", t))
+        self.mode_combo.currentTextChanged.connect(lambda t: self.update_config_and_signal("transcription_mode", t))
         trans_layout.addWidget(self.mode_combo)
+
+        trans_layout.addWidget(QLabel("Whisper Model Size (local / faster):"))
+        self.model_size_combo = QComboBox()
+        self.model_size_combo.addItems(["tiny", "base", "small", "medium", "large"])
+        self.model_size_combo.setCurrentText(config_manager.get("whisper_model_size", "small"))
+        self.model_size_combo.currentTextChanged.connect(lambda t: self.update_config_and_signal("whisper_model_size", t))
+        trans_layout.addWidget(self.model_size_combo)
         
         trans_layout.addWidget(QLabel("OpenAI API Key:"))
         self.api_key_input = QLineEdit()
         self.api_key_input.setText(config_manager.get("openai_api_key", ""))
-        self.api_key_input.textChanged.connect(lambda t: self.update_config("openai_api_key", t))
+        # Applied once typing pauses, not on every keystroke
+        self.api_key_timer = QTimer(self)
+        self.api_key_timer.setSingleShot(True)
+        self.api_key_timer.setInterval(600)
+        self.api_key_timer.timeout.connect(
+            lambda: self.update_config_and_signal("openai_api_key", self.api_key_input.text()))
+        self.api_key_input.textChanged.connect(self.api_key_timer.start)
         trans_layout.addWidget(self.api_key_input)
         
         trans_group.setLayout(trans_layout)
@@ -170,6 +182,7 @@ class SettingsWindow(QWidget):
 
     def populate_devices(self):
         try:
+            import sounddevice as sd
             devices = sd.query_devices()
             default_input = sd.default.device[0]
             for i, dev in enumerate(devices):
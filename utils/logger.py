@@ -8,8 +8,9 @@ def setup_logger(name="MeetingAssistant"):
 
     formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 
-    # Console Handler
-    ch = logging.StreamHandler(sys.stdout)
+    # Console Handler (stderr with MEETING_ASSISTANT_LOG_STREAM=stderr, e.g. when stdout carries data)
+    stream = sys.stderr if os.environ.get("MEETING_ASSISTANT_LOG_STREAM") == "stderr" else sys.stdout
+    ch = logging.StreamHandler(stream)
     ch.setLevel(logging.DEBUG)
     ch.setFormatter(formatter)
     logger.addHandler(ch)
@@ -0,0 +1,109 @@
+import threading
+import time
+from utils.logger import logger
+from utils.config_manager import config_manager
+
+
+class OpenAIClients:
+    """
+    One OpenAI client for the whole app, on one keep-alive connection pool.
+
+    Translator and WhisperCloud both ask get() for the client, so an LLM
+    request can reuse the connection a transcription opened and vice versa.
+    The client follows openai_api_key and openai_base_url; a new key gets a
+    new client on the same pool, built on the next request rather than on
+    every settings change. warm() opens a connection in the background so
+    the first request does not pay for DNS, TCP and TLS setup.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.http = None
+        self.client = None
+        self.client_key = None # (api key, base url) the client was built for
+        self.last_used = 0.0
+        self.warming = False
+        self.warmups = 0
+        self.clients_built = 0
+
+    def _http_client(self):
+        # Called with self.lock held
+        if self.http is None:
+            import httpx
+            # Room for every cloud transcription in flight plus an LLM request
+            connections = max(config_manager.get("openai_max_connections", 8),
+                              config_manager.get("cloud_max_in_flight", 3) + 1)
+            self.http = httpx.Client(
+                limits=httpx.Limits(max_connections=connections,
+                                    max_keepalive_connections=connections,
+                                    keepalive_expiry=self.keepalive()),
+                # Per-request deadlines (e.g. WhisperCloud's) override the read timeout
+                timeout=httpx.Timeout(config_manager.get("openai_timeout", 60.0), connect=5.0)
+            )
+        return self.http
+
+    def keepalive(self):
+        return config_manager.get("openai_keepalive_seconds", 60)
+
+    def get(self):
+        """The client for the configured key, or None without a key."""
+        key = (config_manager.get("openai_api_key", ""), config_manager.get("openai_base_url") or None)
+        if not key[0]:
+            return None
+        with self.lock:
+            if self.client is None or self.client_key != key:
+                from openai import OpenAI # Deferred: the openai package is slow to import
+                self.client = OpenAI(api_key=key[0], base_url=key[1], http_client=self._http_client())
+                self.client_key = key
+                self.clients_built += 1
+            self.last_used = time.monotonic()
+            return self.client
+
+    def warm(self):
+        """
+        Open a pooled connection to the API in the background (no-op without a
+        key). Returns the thread, or None if a warm-up is already running.
+        """
+        with self.lock:
+            if self.warming:
+                return None
+            self.warming = True
+        thread = threading.Thread(target=self._warm, daemon=True)
+        thread.start()
+        return thread
+
+    def warm_if_idle(self):
+        """warm() when the pooled connections have likely expired, e.g. before a request is expected."""
+        if time.monotonic() - self.last_used > self.keepalive():
+            self.warm()
+
+    def _warm(self):
+        try:
+            client = self.get()
+            if client is None:
+                return
+            start = time.perf_counter()
+            # Any response will do: the connection stays in the pool for the next request
+            self.http.head(str(client.base_url), timeout=5.0)
+            self.warmups += 1
+            logger.debug(f"Opened a connection to {client.base_url} in {(time.perf_counter() - start) * 1000:.0f} ms")
+        except Exception as e:
+            logger.debug(f"Connection warm-up failed: {e}")
+        finally:
+            with self.lock:
+                self.warming = False
+
+    def close(self):
+        with self.lock:
+            if self.http is not None:
+                self.http.close()
+            self.http = None
+            self.client = None
+            self.client_key = None
+
+    def stats(self):
+        with self.lock:
+            return {"clients_built": self.clients_built, "warmups": self.warmups}
+
+
+openai_clients = OpenAIClients()
@@ -0,0 +1,66 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from utils.logger import logger
+
+class StartupTracker:
+    """
+    Records when startup milestones happen, relative to the first import of
+    this module (main.py imports it first), and how long background loading
+    stages take.
+    """
+
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.marks = {}
+        self.stages = {}
+        self.lock = threading.Lock()
+        self.budget_ms = None
+        self.on_first_paint = []
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.t0) * 1000
+
+    def mark(self, name):
+        """Record the first time a milestone is reached; later calls are ignored."""
+        with self.lock:
+            if name in self.marks:
+                return False
+            self.marks[name] = self.elapsed_ms()
+        logger.info(f"Startup: {name} at {self.marks[name]:.0f} ms")
+        return True
+
+    def first_paint(self):
+        if not self.mark("first_paint"):
+            return
+        if self.budget_ms and self.marks["first_paint"] > self.budget_ms:
+            logger.warning(f"Startup: first paint took {self.marks['first_paint']:.0f} ms, "
+                           f"over the {self.budget_ms} ms budget.")
+        for callback in self.on_first_paint:
+            callback()
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.stages[name] = (time.perf_counter() - start) * 1000
+            logger.info(f"Startup: stage {name} took {self.stages[name]:.0f} ms")
+
+    def report(self):
+        with self.lock:
+            return {"marks_ms": dict(self.marks), "stages_ms": dict(self.stages)}
+
+    def dump_report(self):
+        # One JSON line on stdout, read by benchmarks/bench_startup.py
+        print("STARTUP_REPORT " + json.dumps(self.report()), flush=True)
+
+
+startup = StartupTracker()
+
+# Set by benchmarks/bench_startup.py: report and exit once the overlay has painted
+BENCH_EXIT_AFTER_PAINT = os.environ.get("MEETING_ASSISTANT_STARTUP_BENCH") == "1"
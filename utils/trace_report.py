@@ -0,0 +1,68 @@
+"""
+Latency percentiles per pipeline stage from logs/traces.jsonl.
+
+Run from the project root:
+    python -m utils.trace_report
+    python -m utils.trace_report --last 200 logs/traces.jsonl
+"""
+import argparse
+import json
+import numpy as np
+from utils.tracing import STAGES, TRACE_FILE
+
+# The waits the user actually sees: speech ended / request sent until it is on screen,
+# and for streamed replies until the first words arrive
+LATENCY_SPANS = {
+    "segment": [("speech_end", "render", "total")],
+    "llm": [("request", "render", "total"), ("request", "first_token", "time to first token")],
+}
+
+
+def load_traces(path, last=None):
+    traces = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                try:
+                    traces.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue # a line cut short by a crash
+    return traces[-last:] if last else traces
+
+
+def stage_durations(traces, kind):
+    """Interval name -> list of ms, for consecutive stages present in each trace."""
+    order = STAGES[kind]
+    durations = {}
+    for trace in traces:
+        ms = trace["ms"]
+        present = [s for s in order if s in ms]
+        for a, b in zip(present, present[1:]):
+            durations.setdefault(f"{a} -> {b}", []).append(ms[b] - ms[a])
+        for start, end, label in LATENCY_SPANS[kind]:
+            if start in ms and end in ms:
+                durations.setdefault(f"{start} -> {end} ({label})", []).append(ms[end] - ms[start])
+    return durations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", nargs="?", default=TRACE_FILE)
+    parser.add_argument("--last", type=int, help="only the most recent N traces")
+    args = parser.parse_args()
+
+    traces = load_traces(args.path, args.last)
+    for kind in STAGES:
+        selected = [t for t in traces if t.get("kind") == kind]
+        if not selected:
+            continue
+        print(f"\n{kind}: {len(selected)} traces")
+        print(f"  {'stage':<44} {'n':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+        for name, values in stage_durations(selected, kind).items():
+            p50, p95, p99 = np.percentile(values, [50, 95, 99])
+            print(f"  {name:<44} {len(values):>5} {p50:>9.1f} {p95:>9.1f} {p99:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
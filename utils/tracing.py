@@ -0,0 +1,94 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from utils.logger import logger
+from utils.config_manager import config_manager
+
+TRACE_FILE = os.path.join("logs", "traces.jsonl")
+
+# Stages in the order they happen, per trace kind
+STAGES = {
+    "segment": ("speech_start", "speech_end", "transcribe_start", "transcribe_end", "callback", "render"),
+    "llm": ("request", "llm_start", "first_token", "llm_end", "render"),
+}
+
+
+class Tracer:
+    """
+    Follows one segment (or LLM request) through the pipeline by trace id.
+
+    Each stage is stamped with time.perf_counter() by whichever thread
+    reaches it; finish() writes one JSON line with the stage offsets in ms
+    from the first stage. Marks on a None or unknown id are ignored, so
+    callers don't need to check whether tracing is on.
+    """
+
+    def __init__(self, path=TRACE_FILE, max_open=256):
+        self.path = path
+        self.max_open = max_open
+        self.enabled = config_manager.get("latency_tracing", True)
+        self.lock = threading.Lock()
+        self._open = OrderedDict() # trace id -> {"kind", "ts", "t0", "ms", fields...}
+        self._file = None
+        self._next_id = 0
+
+    def begin(self, kind, stage):
+        """Start a trace at its first stage. Returns the trace id (None when tracing is off)."""
+        if not self.enabled:
+            return None
+        now = time.perf_counter()
+        with self.lock:
+            self._next_id += 1
+            trace_id = f"{kind[:3]}-{os.getpid()}-{self._next_id}"
+            self._open[trace_id] = {"kind": kind, "ts": round(time.time(), 3), "t0": now, "ms": {stage: 0.0}}
+            # Traces whose segment was merged or dropped never finish
+            while len(self._open) > self.max_open:
+                self._open.popitem(last=False)
+        return trace_id
+
+    def mark(self, trace_id, stage):
+        if trace_id is None:
+            return
+        now = time.perf_counter()
+        with self.lock:
+            trace = self._open.get(trace_id)
+            if trace is not None:
+                trace["ms"][stage] = round((now - trace["t0"]) * 1000, 1)
+
+    def annotate(self, trace_id, **fields):
+        if trace_id is None:
+            return
+        with self.lock:
+            trace = self._open.get(trace_id)
+            if trace is not None:
+                trace.update(fields)
+
+    def discard(self, trace_id):
+        with self.lock:
+            self._open.pop(trace_id, None)
+
+    def finish(self, trace_id, stage=None):
+        """Optionally mark a last stage, then write the trace out."""
+        if trace_id is None:
+            return
+        if stage:
+            self.mark(trace_id, stage)
+        with self.lock:
+            trace = self._open.pop(trace_id, None)
+            if trace is None:
+                return
+            del trace["t0"]
+            trace = {"id": trace_id, **trace}
+            try:
+                if self._file is None:
+                    os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                    self._file = open(self.path, "a", buffering=1)
+                self._file.write(json.dumps(trace, separators=(",", ":")) + "\n")
+            except Exception as e:
+                logger.error(f"Could not write latency trace: {e}")
+                self.enabled = False
+
+
+tracer = Tracer()